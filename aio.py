@@ -0,0 +1,271 @@
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy.engine import make_url
+import pool
+
+# Optional ASGI serving, see asgi.py. The endpoints registered with
+# @view run as coroutines on the event loop, querying the database
+# through an async SQLAlchemy engine (asyncpg, or aiosqlite for SQLite)
+# while other requests proceed, and awaiting independent queries
+# together. Every other endpoint is the plain Flask view, run in a pool of
+# ASGI_THREADS threads. Both go through the same request context, hooks
+# and error handlers as under WSGI.
+#
+# Needs uvicorn (or another ASGI server), greenlet and the async driver:
+#   pip install uvicorn greenlet aiosqlite
+#   uvicorn asgi:app
+
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+# coroutine views by endpoint
+views = {}
+
+
+def view(endpoint):
+    # serves endpoint with the decorated coroutine in ASGI mode
+    def decorator(function):
+        views[endpoint] = function
+        return function
+    return decorator
+
+
+def async_uri(uri):
+    # uri with the async driver of its database
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError('no async driver for ' + backend)
+    return url.set(drivername=backend + '+' + ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+class AsyncDatabase(object):
+    # the async engine of the current app, which init_app() keeps in
+    # app.extensions['async_db']
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        app.config.setdefault('ASYNC_DATABASE_URI', None)
+        uri = app.config['ASYNC_DATABASE_URI']
+        if not uri:
+            # the url of the sync engine, with SQLite paths made absolute
+            # the way Flask-SQLAlchemy does
+            with app.app_context():
+                uri = async_uri(app.extensions['sqlalchemy'].engine.url)
+        engine = create_async_engine(uri, **pool.engine_options(app.config, uri))
+        pool.configure(app, engine.sync_engine, 'async')
+        app.extensions['async_db'] = engine
+
+    @property
+    def engine(self):
+        return current_app.extensions['async_db']
+
+    async def first(self, statement):
+        # the first row of an ORM statement, on a connection of its own so
+        # that it can be awaited together with other queries
+        from sqlalchemy.ext.asyncio import AsyncSession
+        async with AsyncSession(self.engine) as session:
+            return (await session.execute(statement)).unique().first()
+
+    async def all(self, statement):
+        from sqlalchemy.ext.asyncio import AsyncSession
+        async with AsyncSession(self.engine) as session:
+            return (await session.execute(statement)).all()
+
+    async def dispose(self, app):
+        engine = app.extensions.get('async_db')
+        if engine is not None:
+            await engine.dispose()
+
+
+def _environ(scope, body):
+    # the WSGI environ of an ASGI http scope
+    server = scope.get('server') or ('localhost', 80)
+    rootPath = scope.get('root_path', '')
+    path = scope['path'][len(rootPath):] if scope['path'].startswith(rootPath) else scope['path']
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': rootPath.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    return environ
+
+
+class Disconnected(Exception):
+    # the client of a streamed response went away
+    pass
+
+
+async def _disconnect(receive):
+    # returns once the client disconnects
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def _next(queue, watcher):
+    # the next message of queue, or Disconnected once watcher returned
+    getter = asyncio.ensure_future(queue.get())
+    await asyncio.wait([getter, watcher], return_when=asyncio.FIRST_COMPLETED)
+    if getter.done():
+        return getter.result()
+    getter.cancel()
+    raise Disconnected()
+
+
+class AsgiApp(object):
+
+    def __init__(self, app, database):
+        app.config.setdefault('ASGI_THREADS', 8)
+        self.app = app
+        self.database = database
+        self.executor = ThreadPoolExecutor(app.config['ASGI_THREADS'], thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('unsupported scope ' + scope['type'])
+
+        body = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        environ = _environ(scope, b''.join(body))
+        try:
+            endpoint, args = self.app.url_map.bind_to_environ(environ).match()
+        except Exception:
+            endpoint = None
+        if endpoint in views:
+            await self._dispatch(environ, views[endpoint], send)
+        else:
+            await self._run_wsgi(environ, receive, send)
+
+    async def _dispatch(self, environ, function, send):
+        # Flask's wsgi_app() and full_dispatch_request() around a coroutine
+        ctx = self.app.request_context(environ)
+        error = None
+        try:
+            ctx.push()
+            try:
+                response = self.app.preprocess_request()
+                if response is None:
+                    response = await function(**ctx.request.view_args)
+            except Exception as userError:
+                response = self.app.handle_user_exception(userError)
+            response = self.app.finalize_request(response)
+        except Exception as appError:
+            error = appError
+            response = self.app.handle_exception(appError)
+        finally:
+            ctx.pop(error)
+
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                   for name, value in response.headers.items()]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        body = b'' if environ['REQUEST_METHOD'] == 'HEAD' else response.get_data()
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _run_wsgi(self, environ, receive, send):
+        # runs the request and iterates its response in one thread, which
+        # hands the status and chunks of the body over through a queue.
+        # When the client goes away the thread stops at its next chunk and
+        # closes the response, releasing its connection, while the queue
+        # is drained so that it never stays blocked on a full queue.
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=8)
+        disconnected = threading.Event()
+
+        def put(message):
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            put((int(status.split(' ', 1)[0]), headers))
+
+        def run():
+            try:
+                iterable = self.app(environ, start_response)
+                try:
+                    for chunk in iterable:
+                        if disconnected.is_set():
+                            break
+                        if chunk:
+                            put(chunk)
+                finally:
+                    if hasattr(iterable, 'close'):
+                        iterable.close()
+            finally:
+                put(None)
+
+        future = loop.run_in_executor(self.executor, run)
+        watcher = asyncio.ensure_future(_disconnect(receive))
+        finished = False
+        try:
+            message = await _next(queue, watcher)
+            if message is None:
+                finished = True
+                # raises what the app raised
+                await future
+                return
+            status, headers = message
+            await send({'type': 'http.response.start', 'status': status,
+                        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                    for name, value in headers]})
+            while True:
+                chunk = await _next(queue, watcher)
+                if chunk is None:
+                    finished = True
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+            await future
+        except Disconnected:
+            pass
+        finally:
+            watcher.cancel()
+            if not finished:
+                disconnected.set()
+                while await queue.get() is not None:
+                    pass
+                await asyncio.wait([future])
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.database.dispose(self.app)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,60 @@
+import json
+from datetime import date
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Helpers of the read-only JSON API under /api/v1. Responses are encoded
+# with orjson when it is installed, which serializes rows and datetimes
+# natively, and with the standard library otherwise.
+
+MIMETYPE = 'application/json'
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('{!r} is not JSON serializable'.format(value))
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+
+def response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype=MIMETYPE)
+
+
+def error(status, message):
+    return response({"error": {"status": status, "message": message}}, status)
+
+
+def selection(value, available, default=None):
+    # the names listed in a comma separated ?fields= or ?embed= value, in
+    # the order of available, raises ValueError for an unknown one
+    if not value:
+        return tuple(default if default is not None else available)
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - set(available)
+    if unknown:
+        raise ValueError('unknown: ' + ', '.join(sorted(unknown)))
+    return tuple(name for name in available if name in names)
+
+
+def records(rows, fields):
+    # the rows as objects of fields, genres as a list of names
+    return [{field: _field(row, field) for field in fields} for row in rows]
+
+
+def _field(row, field):
+    value = getattr(row, field)
+    if field == 'genres':
+        if value is None or isinstance(value, str):
+            return [genre for genre in (value or '').split(',') if genre]
+        return [genre.name for genre in value]
+    return value
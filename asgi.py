@@ -0,0 +1,9 @@
+from aio import AsgiApp
+from app import create_app
+from extensions import async_db
+
+# Entry point of ASGI servers, e.g. `uvicorn --workers 4 asgi:app`, see
+# aio.py. Configured from the environment like wsgi.py.
+flask_app = create_app()
+async_db.init_app(flask_app)
+app = AsgiApp(flask_app, async_db)
@@ -0,0 +1,198 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# Static asset pipeline. `flask build-assets` copies every file of the
+# static folder to static/dist under a name carrying a hash of its
+# content, concatenates the CSS and JS bundles (minifying the CSS, and the
+# JS too when rjsmin is installed), writes gzip and, with the brotli
+# package, brotli variants of the text files, and records the hashed names
+# in static/dist/manifest.json. Templates link assets through asset_url()
+# and asset_urls(), which fall back to the plain files when nothing was
+# built, and the hashed files are served with an immutable Cache-Control
+# header since their name changes with their content.
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSED_TYPES = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.eot', '.ttf', '.otf')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+ONE_YEAR = 365 * 24 * 60 * 60
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/)', re.S)
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_SOURCE_MAP = re.compile(r'^//[#@] sourceMappingURL=.*$', re.M)
+
+
+def minify_css(css):
+    # drops comments and the whitespace around punctuation, leaving
+    # strings alone
+    parts = []
+    for position, token in enumerate(_CSS_TOKENS.split(css)):
+        if position % 2:
+            if not token.startswith('/*'):
+                parts.append(token)
+            continue
+        token = re.sub(r'\s+', ' ', token)
+        token = re.sub(r'\s*([{};,>])\s*', r'\1', token)
+        token = re.sub(r':\s+', ':', token)
+        parts.append(token.replace(';}', '}'))
+    return ''.join(parts).strip()
+
+
+def _hashed_name(path, content):
+    root, extension = posixpath.splitext(path)
+    return '{}.{}{}'.format(root, hashlib.sha256(content).hexdigest()[:12], extension)
+
+
+def _read_manifest(distFolder):
+    path = os.path.join(distFolder, MANIFEST)
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as manifest:
+        return json.load(manifest)
+
+
+class Assets(object):
+    # the bundles, declared once for every app, and the manifest of the
+    # current app, which init_app() keeps in app.extensions['assets']
+
+    def __init__(self, app=None):
+        self.bundles = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['assets'] = _read_manifest(os.path.join(app.static_folder, DIST))
+        app.add_url_rule(app.static_url_path + '/' + DIST + '/<path:filename>', 'asset', self.send_asset)
+        app.jinja_env.globals.update(asset_url=self.asset_url, asset_urls=self.asset_urls)
+
+    def bundle(self, name, sources):
+        # declares the bundle name, e.g. 'css/app.css', of sources
+        self.bundles[name] = list(sources)
+
+    @property
+    def dist_folder(self):
+        return os.path.join(current_app.static_folder, DIST)
+
+    @property
+    def manifest(self):
+        return current_app.extensions['assets']
+
+    def asset_url(self, path):
+        # the url of the built version of a static file or bundle
+        if path in self.manifest:
+            return url_for('asset', filename=self.manifest[path])
+        return url_for('static', filename=path)
+
+    def asset_urls(self, name):
+        # the url of a bundle once built, else the urls of its sources
+        if name in self.manifest or name not in self.bundles:
+            return [self.asset_url(name)]
+        return [url_for('static', filename=source) for source in self.bundles[name]]
+
+    def send_asset(self, filename):
+        # serves a built file, precompressed when the client accepts it
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in ENCODINGS:
+            if request.accept_encodings[encoding] and \
+                    os.path.isfile(os.path.join(self.dist_folder, filename + suffix)):
+                response = send_from_directory(self.dist_folder, filename + suffix, mimetype=mimetype,
+                                               max_age=ONE_YEAR)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(self.dist_folder, filename, mimetype=mimetype, max_age=ONE_YEAR)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
+
+    def build(self):
+        # writes the hashed files, bundles and compressed variants, and the
+        # manifest. Files of earlier builds stay, for pages cached with
+        # their names.
+        staticFolder = current_app.static_folder
+        paths = []
+        for directory, directories, files in os.walk(staticFolder):
+            # walked in name order, so that builds do not depend on the
+            # order of the file system
+            directories[:] = sorted(name for name in directories
+                                    if os.path.abspath(os.path.join(directory, name)) !=
+                                    os.path.abspath(self.dist_folder))
+            paths.extend(os.path.relpath(os.path.join(directory, filename), staticFolder).replace(os.sep, '/')
+                         for filename in sorted(files) if not filename.startswith('.'))
+
+        # the fonts and images first, so that the stylesheets are rewritten
+        # against all of their hashed names
+        manifest = {}
+        for path in sorted(paths, key=lambda path: path.endswith('.css')):
+            with open(os.path.join(staticFolder, path), 'rb') as source:
+                content = source.read()
+            if path.endswith('.css'):
+                content = self._css(path, content.decode('utf-8'), manifest, path).encode('utf-8')
+            manifest[path] = self._write(path, content)
+
+        for name, sources in sorted(self.bundles.items()):
+            parts = []
+            for source in sources:
+                with open(os.path.join(staticFolder, source), encoding='utf-8') as file:
+                    text = file.read()
+                if name.endswith('.css'):
+                    parts.append(minify_css(self._css(source, text, manifest, name)))
+                elif rjsmin is not None and not source.endswith('.min.js'):
+                    parts.append(rjsmin.jsmin(text))
+                else:
+                    # source maps of the parts do not map the bundle
+                    parts.append(_SOURCE_MAP.sub('', text))
+            separator = '\n' if name.endswith('.css') else '\n;\n'
+            manifest[name] = self._write(name, separator.join(parts).encode('utf-8'))
+
+        with open(os.path.join(self.dist_folder, MANIFEST), 'w') as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+        current_app.extensions['assets'] = manifest
+        return manifest
+
+    def _css(self, source, css, manifest, target):
+        # points the relative urls of source, moved to target in dist, at
+        # the hashed files, or back at the static folder for files that
+        # are not built yet or missing
+        targetFolder = posixpath.dirname(posixpath.join(DIST, target))
+
+        def rewrite(match):
+            quote, url = match.groups()
+            if re.match(r'^([a-z]+:|/|#)', url):
+                return match.group(0)
+            path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+            logical = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+            built = posixpath.join(DIST, manifest[logical]) if logical in manifest else logical
+            return 'url({0}{1}{2}{0})'.format(quote, posixpath.relpath(built, targetFolder), suffix)
+
+        return _CSS_URL.sub(rewrite, css)
+
+    def _write(self, path, content):
+        hashed = _hashed_name(path, content)
+        destination = os.path.join(self.dist_folder, hashed)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, 'wb') as file:
+            file.write(content)
+        if path.endswith(COMPRESSED_TYPES):
+            with open(destination + '.gz', 'wb') as file:
+                file.write(gzip.compress(content, 9, mtime=0))
+            if brotli is not None:
+                with open(destination + '.br', 'wb') as file:
+                    file.write(brotli.compress(content))
+        return hashed
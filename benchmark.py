@@ -0,0 +1,564 @@
+"""Benchmarks every page of Fyyur against a synthetic dataset.
+
+    python benchmark.py --scale 1k --scale 100k --output before.json
+    python benchmark.py --scale 1k --output after.json --compare before.json
+
+Each scale fills a fresh database (a SQLite file by default, or any
+database given with --database) with venues clustered in a few cities,
+artists and shows spread over two years with a realistic past/future
+split. Every route of the app, including the JSON API, the exports and
+the forms, is then driven through the Flask test client, and its
+p50/p95 latency, queries per request and peak Python memory are
+reported and saved as JSON, so that two runs can be compared. The forms
+write to the database, which grows by a few rows per pass. --micro
+adds the cost per call of the datetime template filter and the startup
+time of the app in a fresh interpreter.
+
+--load serves the app with gunicorn (WSGI, sync workers) and then with
+uvicorn (ASGI mode, see asgi.py), both with --workers processes, and
+drives the venue and artist pages over HTTP from --concurrency clients,
+reporting requests per second, latencies and the memory of the servers:
+
+    python benchmark.py --load --workers 2 --concurrency 32
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+SCALES = {
+    # venues, artists, shows
+    '1k': (100, 200, 1000),
+    '100k': (5000, 10000, 100000),
+    '1m': (20000, 50000, 1000000),
+}
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('San Francisco', 'CA'), ('Chicago', 'IL'),
+    ('Austin', 'TX'), ('Nashville', 'TN'), ('Seattle', 'WA'), ('New Orleans', 'LA'),
+    ('Denver', 'CO'), ('Atlanta', 'GA'), ('Portland', 'OR'), ('Boston', 'MA'),
+    ('Detroit', 'MI'), ('Miami', 'FL'), ('Philadelphia', 'PA'), ('Minneapolis', 'MN'),
+]
+
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+          'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B',
+          'Reggae', 'Rock n Roll', 'Soul', 'Other']
+
+WORDS = ['Blue', 'Red', 'Golden', 'Velvet', 'Electric', 'Silver', 'Midnight', 'Wild', 'Lucky',
+         'Hidden', 'Royal', 'Black', 'Crystal', 'Iron', 'Neon', 'Rusty', 'Happy', 'Lonely']
+
+VENUE_NOUNS = ['Hall', 'Room', 'Lounge', 'Club', 'Theatre', 'Tavern', 'Garden', 'Cellar', 'Stage']
+
+ARTIST_NOUNS = ['Band', 'Collective', 'Trio', 'Quartet', 'Orchestra', 'Project', 'Brothers', 'Sisters']
+
+# fraction of the shows that already took place
+PAST_SHARE = 0.7
+
+PAGE_REQUESTS = 20
+
+
+# settings of the app under test, with the database given on the command
+# line, logging to the console only rather than to error.log
+APP_CONFIG = {'CACHE_TYPE': None, 'DEBUG': False, 'SECRET_KEY': 'benchmark', 'ERROR_LOG': None}
+
+
+def load_app(database):
+    from app import create_app
+    return create_app(dict(APP_CONFIG, SQLALCHEMY_DATABASE_URI=database))
+
+
+def city_weights():
+    # a few big cities hold most of the venues
+    return [1.0 / (rank + 1) for rank in range(len(CITIES))]
+
+
+def generate(venues, artists, shows, seed=0):
+    from extensions import db
+    from models import Artist, Genre, Show, Venue, artist_genres, venue_genres
+    from queries import recount_upcoming_shows, refresh_venue_areas
+    random.seed(seed)
+    db.drop_all(bind_key=None)
+    db.create_all(bind_key=None)
+    weights = city_weights()
+    now = datetime.now()
+
+    def batches(rows, size=10000):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # the genre of every venue and artist, by id
+    genreOf = {'venue': {}, 'artist': {}}
+
+    def venue_rows():
+        for id in range(1, venues + 1):
+            city, state = random.choices(CITIES, weights)[0]
+            genreOf['venue'][id] = random.randrange(len(GENRES))
+            yield {
+                'id': id, 'name': '{} {} {}'.format(random.choice(WORDS), random.choice(VENUE_NOUNS), id),
+                'city': city, 'state': state, 'address': '{} Main Street'.format(id),
+                'phone': '555-{:07d}'.format(id), 'image_link': 'https://via.placeholder.com/335x500.png',
+                'genres': GENRES[genreOf['venue'][id]],
+                'facebook_link': 'https://www.facebook.com/venue{}'.format(id),
+            }
+
+    def artist_rows():
+        for id in range(1, artists + 1):
+            city, state = random.choices(CITIES, weights)[0]
+            genreOf['artist'][id] = random.randrange(len(GENRES))
+            yield {
+                'id': id, 'name': '{} {} {}'.format(random.choice(WORDS), random.choice(ARTIST_NOUNS), id),
+                'city': city, 'state': state, 'phone': '556-{:07d}'.format(id),
+                'genres': GENRES[genreOf['artist'][id]], 'image_link': 'https://via.placeholder.com/335x500.png',
+                'facebook_link': 'https://www.facebook.com/artist{}'.format(id),
+            }
+
+    def show_rows():
+        for id in range(1, shows + 1):
+            if random.random() < PAST_SHARE:
+                start = now - timedelta(days=random.uniform(0, 730))
+            else:
+                start = now + timedelta(days=random.uniform(0, 365))
+            yield {
+                'id': id, 'start_time': start.replace(microsecond=0),
+                'venue_id': random.randint(1, venues), 'artist_id': random.randint(1, artists),
+            }
+
+    def genre_links(kind):
+        for id, genre in genreOf[kind].items():
+            yield {kind + '_id': id, 'genre_id': genre + 1}
+
+    db.session.execute(Genre.__table__.insert(),
+                       [{'id': id, 'name': name} for id, name in enumerate(GENRES, 1)])
+    for table, rows in ((Venue.__table__, venue_rows()),
+                        (Artist.__table__, artist_rows()),
+                        (venue_genres, genre_links('venue')),
+                        (artist_genres, genre_links('artist')),
+                        (Show.__table__, show_rows())):
+        for batch in batches(rows):
+            db.session.execute(table.insert(), batch)
+    # bulk inserts skip the mapper events that maintain the counters
+    recount_upcoming_shows(Venue)
+    recount_upcoming_shows(Artist)
+    db.session.commit()
+    refresh_venue_areas()
+
+
+# endpoints left out: static files, and the token-gated internal pages
+SKIPPED_ENDPOINTS = ('static', 'asset', 'main.metrics', 'main.cache_stats')
+
+# order of the methods within a pass, deletes remove what the posts created
+METHOD_ORDER = ('GET', 'POST', 'DELETE')
+
+
+def route_variants(endpoint, picks, now):
+    # the (suffix, query arguments) of the requests timed for endpoint,
+    # besides its plain URL: deep pages of the listings and the other
+    # pages of past shows
+    from queries import encode_cursor
+    area = encode_cursor([picks.choice(CITIES)[1], '', '', 0])
+    name = encode_cursor([picks.choice(WORDS), 0])
+    later = encode_cursor([now + timedelta(days=picks.uniform(30, 300)), 0])
+    variants = {
+        'venues.venues': [('', {}), ('_deep', {'after': area})],
+        'api.api_venues': [('', {}), ('_deep', {'after': area}), ('_embed', {'embed': 'upcoming_shows'})],
+        'artists.artists': [('', {}), ('_deep', {'after': name})],
+        'api.api_artists': [('', {}), ('_deep', {'after': name})],
+        'shows.shows': [('', {}), ('_all', {'include_past': 1}), ('_deep', {'after': later})],
+        'api.api_shows': [('', {}), ('_deep', {'after': later})],
+        'venues.show_venue': [('', {}), ('_page2', {'page': 2})],
+        'artists.show_artist': [('', {}), ('_page2', {'page': 2})],
+        'api.api_venue': [('', {'embed': 'upcoming_shows,past_shows'})],
+        'api.api_artist': [('', {'embed': 'upcoming_shows,past_shows'})],
+        'main.show_genre': [('', {}), ('_state', {'state': picks.choice(CITIES)[1]})],
+        'main.search_suggest': [('', {'q': picks.choice(WORDS).lower()[:2]})],
+        # a year ahead holds a few shows at every scale
+        'shows.export_shows': [('', {'start_after': (now + timedelta(days=360)).isoformat()})],
+    }
+    return variants.get(endpoint, [('', {})])
+
+
+def route_arguments(endpoint, arguments, picks, venues, artists, sequence):
+    # values of the URL arguments of endpoint, and the body it is sent: a
+    # form, or a list for JSON
+    values = {}
+    if 'venue_id' in arguments:
+        values['venue_id'] = picks.randint(1, venues)
+    if 'artist_id' in arguments:
+        values['artist_id'] = picks.randint(1, artists)
+    if 'name' in arguments:
+        values['name'] = picks.choice(GENRES)
+    if 'format' in arguments:
+        values['format'] = picks.choice(['csv', 'jsonl'])
+
+    # the writes book slots over a year ahead, after the generated shows,
+    # and create venues and artists with fields of their own, so that
+    # none of them is refused
+    number = next(sequence)
+    city, state = picks.choice(CITIES)
+    start = datetime.now().replace(microsecond=0) + timedelta(days=400)
+
+    def slot():
+        return start + timedelta(hours=3 * next(sequence))
+    word = picks.choice(WORDS)
+    bodies = {
+        'venues.search_venues': {'search_term': word},
+        'artists.search_artists': {'search_term': word.lower()[:3]},
+        'venues.create_venue_submission': {
+            'name': 'Benchmark Hall {}'.format(number), 'city': city, 'state': state,
+            'address': '{} Benchmark Street'.format(number), 'phone': '557-{:07d}'.format(number),
+            'facebook_link': 'https://www.facebook.com/benchmarkvenue{}'.format(number), 'genres': 'Jazz'},
+        'artists.create_artist_submission': {
+            'name': 'Benchmark Band {}'.format(number), 'city': city, 'state': state,
+            'phone': '558-{:07d}'.format(number),
+            'facebook_link': 'https://www.facebook.com/benchmarkartist{}'.format(number), 'genres': 'Jazz'},
+        'shows.create_show_submission': {
+            'venue_id': picks.randint(1, venues), 'artist_id': picks.randint(1, artists),
+            'start_time': slot().strftime('%Y-%m-%d %H:%M:%S')},
+        'shows.schedule_shows_submission': [
+            {'venue_id': picks.randint(1, venues), 'artist_id': picks.randint(1, artists),
+             'start_time': slot().isoformat(), 'duration': 90}
+            for row in range(3)],
+    }
+    if endpoint == 'venues.edit_venue_submission':
+        # the fields the venue was generated with, under a new name
+        id = values['venue_id']
+        bodies[endpoint] = {
+            'name': 'Edited Hall {}'.format(id), 'city': city, 'state': state,
+            'address': '{} Main Street'.format(id), 'phone': '555-{:07d}'.format(id),
+            'facebook_link': 'https://www.facebook.com/venue{}'.format(id), 'genres': 'Jazz'}
+    elif endpoint == 'artists.edit_artist_submission':
+        id = values['artist_id']
+        bodies[endpoint] = {
+            'name': 'Edited Band {}'.format(id), 'city': city, 'state': state,
+            'phone': '556-{:07d}'.format(id),
+            'facebook_link': 'https://www.facebook.com/artist{}'.format(id), 'genres': 'Jazz'}
+    return values, bodies.get(endpoint)
+
+
+def routes(app, venues, artists, sequence):
+    # (name, method, path, body) of the requests to time: every endpoint
+    # of the app with each of its methods, see route_variants(). The
+    # DELETE of a venue removes the last venue created by the benchmark.
+    from extensions import db
+    from models import Venue
+    picks = random.Random(1)
+    now = datetime.now()
+    adapter = app.url_map.bind('localhost')
+    rules = sorted(((method, rule) for rule in app.url_map.iter_rules()
+                    if rule.endpoint not in SKIPPED_ENDPOINTS
+                    for method in rule.methods if method in METHOD_ORDER),
+                   key=lambda item: (METHOD_ORDER.index(item[0]), item[1].endpoint))
+    for _ in range(PAGE_REQUESTS):
+        for method, rule in rules:
+            values, body = route_arguments(rule.endpoint, rule.arguments, picks, venues, artists, sequence)
+            if rule.endpoint == 'venues.delete_venue':
+                with app.app_context():
+                    values['venue_id'] = db.session.query(db.func.max(Venue.id)) \
+                        .filter(Venue.name.like('Benchmark Hall %')).scalar() or 0
+            short = rule.endpoint.split('.')[-1]
+            for suffix, arguments in route_variants(rule.endpoint, picks, now):
+                yield short + suffix, method, adapter.build(rule.endpoint, dict(values, **arguments)), body
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def send(client, method, path, body):
+    # a form is posted as such, a list as JSON
+    if isinstance(body, list):
+        return client.open(path, method=method, json=body)
+    return client.open(path, method=method, data=body)
+
+
+def run(app, venues, artists, repeat):
+    import itertools
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    queries = []
+
+    def count_query(*args):
+        queries.append(1)
+
+    event.listen(Engine, 'after_cursor_execute', count_query)
+    client = app.test_client()
+    sequence = itertools.count(1)
+    # warm up the autocomplete index and the database caches
+    for name, method, path, body in routes(app, venues, artists, sequence):
+        send(client, method, path, body)
+
+    samples = {}
+    for _ in range(repeat):
+        for name, method, path, body in routes(app, venues, artists, sequence):
+            del queries[:]
+            tracemalloc.start()
+            started = time.perf_counter()
+            response = send(client, method, path, body)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if response.status_code >= 400:
+                raise RuntimeError('{} {} answered {}'.format(method, path, response.status_code))
+            samples.setdefault(name, []).append((elapsed, len(queries), peak))
+    event.remove(Engine, 'after_cursor_execute', count_query)
+
+    results = {}
+    for name, measured in samples.items():
+        latencies = [sample[0] * 1000 for sample in measured]
+        results[name] = {
+            'requests': len(measured),
+            'p50_ms': round(percentile(latencies, 0.5), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'queries_per_request': round(sum(sample[1] for sample in measured) / float(len(measured)), 2),
+            'peak_memory_kb': round(max(sample[2] for sample in measured) / 1024.0, 1),
+        }
+    return results
+
+
+def datetime_filter(app, calls=20000, distinct=200):
+    # microseconds per call of the datetime template filter over a page
+    # worth of start times, against formatting every value with Babel
+    import babel.dates
+    from filters import DATETIME_FORMATS, datetime_pattern
+    start = datetime(2020, 1, 1, 20, 0)
+    values = [start + timedelta(hours=7 * (call % distinct)) for call in range(calls)]
+    pattern = DATETIME_FORMATS['full']
+    format_datetime = app.jinja_env.filters['datetime']
+
+    def timed(format_value):
+        started = time.perf_counter()
+        for value in values:
+            format_value(value)
+        return round((time.perf_counter() - started) * 1e6 / calls, 3)
+
+    with app.app_context():
+        baseline = timed(lambda value: babel.dates.format_datetime(value, pattern, locale='en_US'))
+        format_datetime.cache.cache_clear()
+        datetime_pattern.cache_clear()
+        cold = timed(lambda value: format_datetime(value, 'full'))
+        warm = timed(lambda value: format_datetime(value, 'full'))
+    return {'calls': calls, 'distinct': distinct, 'babel_us': baseline, 'filter_us': cold, 'filter_warm_us': warm}
+
+
+def startup(database, runs=5):
+    # milliseconds to import app.py and to create the app, in fresh
+    # interpreters, the best of runs
+    script = ('import json, sys, time; started = time.perf_counter(); import app; imported = time.perf_counter(); '
+              'app.create_app(dict(json.loads(sys.argv[1]))); created = time.perf_counter(); '
+              'print(json.dumps([imported - started, created - imported]))')
+    config = json.dumps(dict(APP_CONFIG, SQLALCHEMY_DATABASE_URI=database))
+    timings = [json.loads(subprocess.check_output([sys.executable, '-c', script, config], stderr=subprocess.DEVNULL,
+                                                  cwd=os.path.dirname(os.path.abspath(__file__))))
+               for _ in range(runs)]
+    return {'import_ms': round(min(timing[0] for timing in timings) * 1000, 1),
+            'create_app_ms': round(min(timing[1] for timing in timings) * 1000, 1)}
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def tree_rss(pid):
+    # resident memory in kB of a process and its descendants, Linux only
+    try:
+        with open('/proc/{}/status'.format(pid)) as status:
+            rss = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+        with open('/proc/{0}/task/{0}/children'.format(pid)) as children:
+            return rss + sum(tree_rss(int(child)) for child in children.read().split())
+    except (OSError, StopIteration):
+        return 0
+
+
+def serve(command, port, database):
+    # starts a server of the app and waits until it answers
+    env = dict(os.environ, DATABASE_URL=database, SECRET_KEY='benchmark', FYYUR_CACHE_TYPE='null',
+               FYYUR_ERROR_LOG='null')
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            connection.close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('server did not start: ' + ' '.join(command))
+
+
+def hammer(port, venues, artists, concurrency, duration):
+    # requests per second and latencies of concurrency clients asking for
+    # venue and artist pages in a loop for duration seconds
+    def client(number):
+        picks = random.Random(number)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        latencies = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            if picks.random() < 0.5:
+                path = '/venues/{}'.format(picks.randint(1, venues))
+            else:
+                path = '/artists/{}'.format(picks.randint(1, artists))
+            started = time.perf_counter()
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError('GET {} answered {}'.format(path, response.status))
+            latencies.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        return latencies
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = [latency for result in pool.map(client, range(concurrency)) for latency in result]
+    return {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / float(duration), 1),
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+    }
+
+
+def load_test(database, venues, artists, workers, concurrency, duration):
+    # the WSGI app under gunicorn against the ASGI mode under uvicorn,
+    # with as many worker processes each
+    modes = {
+        'wsgi': ['gunicorn', '--workers', str(workers), '--bind', '127.0.0.1:{port}', 'wsgi:app'],
+        'asgi': ['uvicorn', '--workers', str(workers), '--port', '{port}', '--no-access-log', 'asgi:app'],
+    }
+    results = {}
+    for mode, command in sorted(modes.items(), reverse=True):
+        port = free_port()
+        server = serve([part.format(port=port) for part in command], port, database)
+        try:
+            # warm up the connections and templates of every worker
+            hammer(port, venues, artists, concurrency, 1)
+            results[mode] = hammer(port, venues, artists, concurrency, duration)
+            results[mode]['rss_mb'] = round(tree_rss(server.pid) / 1024.0, 1)
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def compare(current, baseline, tolerance):
+    # prints the changes against a previous run, returns the regressions
+    regressions = []
+    for scale, routesResults in sorted(current['scales'].items()):
+        for name, result in sorted(routesResults.items()):
+            before = baseline.get('scales', {}).get(scale, {}).get(name)
+            if before is None:
+                continue
+            change = (result['p95_ms'] - before['p95_ms']) / max(before['p95_ms'], 0.001)
+            print('{:>5} {:<26} p95 {:>9.2f}ms -> {:>9.2f}ms ({:+.0%})  queries {} -> {}'.format(
+                scale, name, before['p95_ms'], result['p95_ms'], change,
+                before['queries_per_request'], result['queries_per_request']))
+            if change > tolerance or result['queries_per_request'] > before['queries_per_request']:
+                regressions.append('{} {}'.format(scale, name))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', action='append', choices=sorted(SCALES),
+                        help='dataset size, may be repeated (default: 1k)')
+    parser.add_argument('--database', default='sqlite:///benchmark.db',
+                        help='database to fill, it is dropped and recreated for every scale')
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the routes per scale')
+    parser.add_argument('--micro', action='store_true',
+                        help='also time the datetime template filter and the startup of the app')
+    parser.add_argument('--load', action='store_true',
+                        help='also load test the WSGI and ASGI servers, needs gunicorn and uvicorn')
+    parser.add_argument('--workers', type=int, default=2, help='server processes of --load (default: 2)')
+    parser.add_argument('--concurrency', type=int, default=32, help='clients of --load (default: 32)')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per server of --load (default: 10)')
+    parser.add_argument('--output', help='file to save the results to as JSON')
+    parser.add_argument('--compare', help='results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='p95 slowdown tolerated by --compare before failing (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    app = load_app(args.database)
+    from extensions import suggestions
+    report = {
+        'revision': git_revision(),
+        'created': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'database': args.database.split(':')[0],
+        'scales': {},
+    }
+    for scale in args.scale or ['1k']:
+        venues, artists, shows = SCALES[scale]
+        with app.app_context():
+            started = time.perf_counter()
+            generate(venues, artists, shows)
+            print('{}: generated {} venues, {} artists, {} shows in {:.1f}s'.format(
+                scale, venues, artists, shows, time.perf_counter() - started))
+            suggestions.built = False
+        report['scales'][scale] = run(app, venues, artists, args.repeat)
+        for name, result in sorted(report['scales'][scale].items()):
+            print('{:>5} {:<26} p50 {p50_ms:>9.2f}ms  p95 {p95_ms:>9.2f}ms  '
+                  'queries {queries_per_request:>6}  peak {peak_memory_kb:>9.1f}kB'.format(scale, name, **result))
+
+    if args.micro:
+        report['datetime_filter'] = datetime_filter(app)
+        print('datetime filter: {babel_us}us per call with Babel, {filter_us}us through the filter, '
+              '{filter_warm_us}us once cached ({calls} calls over {distinct} start times)'.format(
+                  **report['datetime_filter']))
+        report['startup'] = startup(args.database)
+        print('startup: {import_ms}ms to import app.py, {create_app_ms}ms in create_app()'.format(**report['startup']))
+
+    if args.load:
+        venues, artists, shows = SCALES[(args.scale or ['1k'])[-1]]
+        report['load'] = load_test(args.database, venues, artists, args.workers, args.concurrency, args.duration)
+        for mode, result in sorted(report['load'].items(), reverse=True):
+            print('{}: {requests_per_second:>8.1f} req/s  p50 {p50_ms:>8.2f}ms  p95 {p95_ms:>8.2f}ms  '
+                  'rss {rss_mb:>7.1f}MB ({} workers, {} clients)'.format(
+                      mode, args.workers, args.concurrency, **result))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(report, json.load(baseline), args.tolerance)
+        if regressions:
+            print('regressions: ' + ', '.join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,321 @@
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import Response, current_app, g, request, session
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+# Response cache for the read-only pages. A cached page is stored with the
+# tags of the venues, artists and shows it was built from, and the write
+# handlers invalidate exactly those tags, so a page is only rebuilt after
+# something on it changed or its TTL ran out.
+#
+# Templates also cache fragments of markup with {% cache key, ttl %}. The
+# key of a fragment carries the version of what it shows, e.g.
+# ('venue', venue.id, venue.updated_at), so an edit moves it to a new key
+# and fragments never need invalidating.
+#
+# The 'memory' backend is per process: an invalidation only reaches the
+# cache of the process making the write. Other workers of a server, and
+# the servers after a flask command such as import or rollover-counters,
+# keep serving their copies until CACHE_DEFAULT_TIMEOUT runs out. Servers
+# running more than one worker should use the 'redis' backend, which
+# every process shares.
+
+
+# validators of a page, kept so that cache hits can still answer 304
+STORED_HEADERS = ('ETag', 'Last-Modified')
+
+
+class MemoryBackend(object):
+    # per-process LRU with a TTL per entry
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires, tags = entry
+            if expires < time.time():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, tags):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (value, time.time() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisBackend(object):
+    # shared between processes through any client with the redis-py API,
+    # a tag is a set of the keys tagged with it. Eviction is left to the
+    # server's maxmemory-policy, e.g. allkeys-lru.
+
+    def __init__(self, client, prefix='fyyur:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl, tags):
+        pipeline = self.client.pipeline()
+        pipeline.set(self.prefix + key, value, ex=ttl)
+        for tag in tags:
+            pipeline.sadd(self.prefix + 'tag:' + tag, self.prefix + key)
+            pipeline.expire(self.prefix + 'tag:' + tag, ttl)
+        pipeline.execute()
+
+    def invalidate(self, tags):
+        for tag in tags:
+            tagKey = self.prefix + 'tag:' + tag
+            keys = list(self.client.smembers(tagKey))
+            self.client.delete(tagKey, *keys)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class FragmentCacheExtension(Extension):
+    # {% cache key, ttl %}...{% endcache %}, key is a value or a tuple of
+    # values and ttl defaults to CACHE_FRAGMENT_TIMEOUT
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cache', args), [], [], body).set_lineno(lineno)
+
+    def _cache(self, key, ttl, caller):
+        responseCache = getattr(self.environment, 'fragment_cache', None)
+        if responseCache is None:
+            return caller()
+        return responseCache.fragment(key, ttl, caller)
+
+
+class CacheState(object):
+    # the backends and counters of the cache of one app
+
+    def __init__(self, config):
+        self.timeout = config['CACHE_DEFAULT_TIMEOUT']
+        self.fragment_timeout = config['CACHE_FRAGMENT_TIMEOUT']
+        self.backend = self.fragments = None
+        if config['CACHE_TYPE'] == 'memory':
+            self.backend = MemoryBackend(config['CACHE_MAX_ENTRIES'])
+            # fragments get their own LRU so that they never evict pages
+            self.fragments = MemoryBackend(config['CACHE_FRAGMENT_MAX_ENTRIES'])
+        elif config['CACHE_TYPE'] == 'redis':
+            import redis
+            self.backend = RedisBackend(redis.from_url(config['CACHE_REDIS_URL']))
+            self.fragments = self.backend
+        elif config['CACHE_TYPE'] is not None:
+            raise ValueError('unknown CACHE_TYPE ' + config['CACHE_TYPE'])
+        self.hits = {}
+        self.misses = {}
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+        # the counters are shared by the threads of the process
+        self.lock = threading.Lock()
+
+
+class ResponseCache(object):
+    # the cache of the current app, whose CacheState init_app() keeps in
+    # app.extensions['cache']
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_TYPE', 'memory')
+        app.config.setdefault('CACHE_DEFAULT_TIMEOUT', 60)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('CACHE_FRAGMENT_TIMEOUT', 3600)
+        app.config.setdefault('CACHE_FRAGMENT_MAX_ENTRIES', 8192)
+        app.extensions['cache'] = CacheState(app.config)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+
+    @property
+    def state(self):
+        return current_app.extensions['cache']
+
+    def tag(self, *tags):
+        # adds tags to the page being built, for the entities it shows
+        g.setdefault('cache_tags', set()).update(tags)
+
+    def invalidate(self, *tags):
+        state = self.state
+        if state.backend is not None:
+            state.backend.invalidate(tags)
+
+    def clear(self):
+        state = self.state
+        if state.backend is not None:
+            state.backend.clear()
+        if state.fragments is not None and state.fragments is not state.backend:
+            state.fragments.clear()
+
+    def fragment(self, key, ttl, render):
+        # the markup cached under key, rendered and stored on a miss
+        state = self.state
+        if state.fragments is None:
+            return render()
+        if isinstance(key, (tuple, list)):
+            key = ':'.join(str(part) for part in key)
+        key = 'fragment:' + str(key)
+        value = state.fragments.get(key)
+        with state.lock:
+            if value is not None:
+                state.fragment_hits += 1
+            else:
+                state.fragment_misses += 1
+        if value is not None:
+            return Markup(value.decode('utf-8') if isinstance(value, bytes) else value)
+        value = render()
+        state.fragments.set(key, str(value), ttl or state.fragment_timeout, ())
+        return Markup(value)
+
+    def cached(self, *tags):
+        # caches the view per path and query string, tagged with tags
+        # formatted with the view arguments, e.g. 'venue:{venue_id}'. The
+        # view may be a coroutine, see aio.py.
+        def decorator(view):
+            if inspect.iscoroutinefunction(view):
+                @wraps(view)
+                async def wrapper(**kwargs):
+                    if self._bypass():
+                        return await view(**kwargs)
+                    response = self._lookup()
+                    if response is None:
+                        response = self._store(await view(**kwargs), tags, kwargs)
+                    return response
+                return wrapper
+
+            @wraps(view)
+            def wrapper(**kwargs):
+                if self._bypass():
+                    return view(**kwargs)
+                response = self._lookup()
+                if response is None:
+                    response = self._store(view(**kwargs), tags, kwargs)
+                return response
+            return wrapper
+        return decorator
+
+    def counters(self):
+        # a consistent copy of the page hits and misses per endpoint and of
+        # the fragment hits and misses
+        state = self.state
+        with state.lock:
+            return dict(state.hits), dict(state.misses), state.fragment_hits, state.fragment_misses
+
+    def stats(self):
+        hits, misses, fragmentHits, fragmentMisses = self.counters()
+        return {
+            "hits": sum(hits.values()),
+            "misses": sum(misses.values()),
+            "endpoints": {endpoint: {"hits": hits.get(endpoint, 0), "misses": misses.get(endpoint, 0)}
+                          for endpoint in sorted(set(hits) | set(misses))},
+            "fragments": {"hits": fragmentHits, "misses": fragmentMisses}
+        }
+
+    def metric_lines(self):
+        # the hit and miss counters in the Prometheus text format
+        hits, misses, fragmentHits, fragmentMisses = self.counters()
+        lines = []
+        for name, counters in (('hits', hits), ('misses', misses)):
+            lines.append('# HELP fyyur_cache_{0}_total Response cache {0}.'.format(name))
+            lines.append('# TYPE fyyur_cache_{}_total counter'.format(name))
+            for endpoint, value in sorted(counters.items()):
+                lines.append('fyyur_cache_{}_total{{endpoint="{}"}} {}'.format(name, endpoint, value))
+        for name, value in (('hits', fragmentHits), ('misses', fragmentMisses)):
+            lines.append('# HELP fyyur_fragment_cache_{0}_total Template fragment cache {0}.'.format(name))
+            lines.append('# TYPE fyyur_fragment_cache_{}_total counter'.format(name))
+            lines.append('fyyur_fragment_cache_{}_total {}'.format(name, value))
+        return lines
+
+    def _bypass(self):
+        # pages carry the flashed messages of the session they were built
+        # for, so those are never cached nor served from cache, and users
+        # reading their own writes skip pages that a lagging replica may
+        # have filled
+        return self.state.backend is None or '_flashes' in session or g.get('read_your_writes')
+
+    def _lookup(self):
+        value = self.state.backend.get(self._key())
+        if value is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        header, body = value.split(b'\n', 1)
+        status, mimetype, headers = json.loads(header)
+        response = Response(body, status=status, mimetype=mimetype, headers=headers)
+        return response.make_conditional(request)
+
+    def _store(self, response, tags, kwargs):
+        if not isinstance(response, Response):
+            response = Response(response)
+        if response.status_code == 200 and not response.direct_passthrough:
+            headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+            header = json.dumps([response.status_code, response.mimetype, headers]).encode()
+            pageTags = {tag.format(**kwargs) for tag in tags} | g.pop('cache_tags', set())
+            state = self.state
+            state.backend.set(self._key(), header + b'\n' + response.get_data(), state.timeout, pageTags)
+        return response
+
+    def _key(self):
+        return 'view:' + request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+
+    def _count(self, name):
+        state = self.state
+        with state.lock:
+            counters = getattr(state, name)
+            counters[request.endpoint] = counters.get(request.endpoint, 0) + 1
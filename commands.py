@@ -0,0 +1,273 @@
+from datetime import datetime
+import click
+from flask import Blueprint, current_app
+import export
+import importer
+import summary
+from extensions import assets, cache, db
+from models import Artist, Show, Venue
+from queries import (ARTISTS_KEY, EXPORT_COLUMNS, SHOWS_KEY, VENUE_SUMMARY_KEY, check_bookings, counter_drift,
+                     export_filters, export_shows_query, genre_members_query, genre_shows_query, invalidate_shows,
+                     recount_upcoming_shows, refresh_venue_areas, replace_genres, schedule_shows, search_query,
+                     show_duration, show_listing_query, shows_query, venue_areas_query)
+
+# The maintenance commands, registered on the flask command itself, e.g.
+# `flask import venues venues.csv`
+bp = Blueprint('commands', __name__, cli_group=None)
+
+
+def explain(query):
+    # the planner output for query, as a single string
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if db.engine.dialect.name == 'sqlite':
+        statement = 'EXPLAIN QUERY PLAN ' + str(compiled)
+    else:
+        statement = 'EXPLAIN ' + str(compiled)
+    rows = db.session.connection().exec_driver_sql(statement, params).fetchall()
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+@bp.cli.command('check-indexes')
+def check_indexes():
+    """Asserts that the main view queries are planned on their indexes."""
+    if db.engine.dialect.name == 'postgresql':
+        # small development tables would be scanned anyway
+        db.session.execute(db.text('SET LOCAL enable_seqscan = off'))
+
+    checks = [
+        ('venues', venue_areas_query().order_by(*VENUE_SUMMARY_KEY), 'ix_VenueAreaSummary_state_city'),
+        ('artists', Artist.query.with_entities(Artist.id, Artist.name).order_by(*ARTISTS_KEY), 'ix_Artist_name'),
+        ('shows', shows_query().order_by(*SHOWS_KEY), 'ix_Show_start_time'),
+        ('show_venue', show_listing_query(Venue, 1), 'ix_Show_venue_id_start_time'),
+        ('show_artist', show_listing_query(Artist, 1), 'ix_Show_artist_id_start_time'),
+        ('genre_venues', genre_members_query(Venue, 1), 'ix_VenueGenre_genre_id_venue_id'),
+        ('genre_shows', genre_shows_query(1, 'CA').order_by(*SHOWS_KEY), 'ix_ArtistGenre_genre_id_artist_id'),
+    ]
+    if db.engine.dialect.name == 'postgresql':
+        checks += [
+            ('search_venues', search_query(Venue, 'a'), 'ix_Venue_search'),
+            ('search_artists', search_query(Artist, 'a'), 'ix_Artist_search'),
+        ]
+    failed = []
+    for view, query, index in checks:
+        plan = explain(query)
+        if index in plan:
+            click.echo('ok       {} uses {}'.format(view, index))
+        else:
+            click.echo('MISSING  {} does not use {}\n{}'.format(view, index, plan))
+            failed.append(view)
+    db.session.rollback()
+    if failed:
+        raise click.ClickException('unindexed queries: ' + ', '.join(failed))
+
+
+@bp.cli.command('rollover-counters')
+def rollover_counters():
+    """Recounts the venues and artists whose shows have just started."""
+    # meant to run from cron more often than COUNTER_ROLLOVER_WINDOW, a
+    # show is looked at by every run of the window after it started
+    now = datetime.now()
+    since = now - current_app.config['COUNTER_ROLLOVER_WINDOW']
+    started = db.session.query(Show.venue_id, Show.artist_id) \
+        .filter(Show.start_time > since, Show.start_time <= now) \
+        .all()
+    venues = recount_upcoming_shows(Venue, {show.venue_id for show in started})
+    artists = recount_upcoming_shows(Artist, {show.artist_id for show in started})
+    db.session.commit()
+    # the summary of /venues counts the upcoming shows as of its refresh
+    if started:
+        refresh_venue_areas({show.venue_id for show in started})
+    cache.invalidate(*['venue:{}'.format(show.venue_id) for show in started])
+    cache.invalidate(*['artist:{}'.format(show.artist_id) for show in started])
+    if started:
+        cache.invalidate('genres')
+    click.echo('recounted {} venues and {} artists'.format(venues, artists))
+
+
+@bp.cli.command('refresh-venue-areas')
+def refresh_venue_areas_command():
+    """Recomputes the summary behind the /venues page."""
+    # meant to run from cron now and then, rollover-counters refreshes
+    # the venues of the shows that started since its last run
+    started = datetime.now()
+    summary.refresh(db.session, Venue.__table__, Show.__table__)
+    db.session.commit()
+    click.echo('refreshed in {:.2f}s'.format((datetime.now() - started).total_seconds()))
+
+
+@bp.cli.command('check-counters')
+@click.option('--fix', is_flag=True, help='Recount the venues and artists that drifted.')
+def check_counters(fix):
+    """Reports upcoming show counters that drifted from the shows."""
+    drifted = []
+    for entity in (Venue, Artist):
+        for id, stored, actual in counter_drift(entity):
+            click.echo('{} {}: stored {}, actual {}'.format(entity.__tablename__, id, stored, actual))
+            drifted.append((entity, id))
+    if drifted and fix:
+        for entity in (Venue, Artist):
+            recount_upcoming_shows(entity, [id for driftedEntity, id in drifted if driftedEntity is entity])
+        db.session.commit()
+        click.echo('fixed {} counters'.format(len(drifted)))
+    elif drifted:
+        raise click.ClickException('{} counters drifted'.format(len(drifted)))
+    else:
+        click.echo('all counters are consistent')
+
+
+@bp.cli.command('export')
+@click.argument('output', type=click.File('wb'), default='-')
+@click.option('--format', 'format', type=click.Choice(sorted(export.MIMETYPES)), default='jsonl', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--start-after', help='Only shows starting at or after this date.')
+@click.option('--start-before', help='Only shows starting before this date.')
+@click.option('--modified-since', help='Only shows created or changed since this date.')
+def export_rows(output, format, compress, **filters):
+    """Exports the shows as JSON lines or CSV."""
+    try:
+        query = export_shows_query(**export_filters(filters))
+    except ValueError as error:
+        raise click.BadParameter(str(error))
+    body = export.chunks(export.lines(query, EXPORT_COLUMNS, format))
+    if compress:
+        body = export.gzipped(body)
+    for chunk in body:
+        output.write(chunk)
+
+
+@bp.cli.command('schedule')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']),
+              help='Format of the source, guessed from its extension by default.')
+@click.option('--dry-run', is_flag=True, help='Only report the conflicts.')
+def schedule_rows(source, format, dry_run):
+    """Books shows of venue_id, artist_id, start_time and duration rows."""
+    format = format or ('jsonl' if source.name.endswith(('.jsonl', '.json')) else 'csv')
+    shows, refused = schedule_shows(importer.read_rows(source, format))
+    for number, errors in refused:
+        click.echo('line {}: {}'.format(number, '; '.join(errors)), err=True)
+    if dry_run:
+        db.session.rollback()
+        click.echo('{} shows can be booked, {} conflict'.format(len(shows), len(refused)))
+        return
+    db.session.commit()
+    invalidate_shows([show for number, show in shows])
+    click.echo('booked {} shows, {} refused'.format(len(shows), len(refused)))
+
+
+# form, model and the unique columns upserted on of each kind of import,
+# the forms are imported by the command only
+IMPORTS = {
+    'venues': ('VenueForm', Venue, ('address', 'phone', 'facebook_link')),
+    'artists': ('ArtistForm', Artist, ('phone', 'facebook_link')),
+    'shows': ('ShowForm', Show, ()),
+}
+
+
+def import_columns(entity, data):
+    # the columns of a validated row, as the create handlers store them
+    if entity is Show:
+        return {'venue_id': int(data['venue_id']),
+                'artist_id': int(data['artist_id']),
+                'start_time': data['start_time'],
+                'end_time': data['start_time'] + show_duration(data['duration'])}
+    row = {column: data[column] or None for column in ('name', 'city', 'state', 'phone', 'facebook_link')}
+    # the genres column, Venue.genre_names on the model
+    row['genres'] = ','.join(dict.fromkeys(data['genres']))
+    row['image_link'] = data['image_link'] or 'https://via.placeholder.com/335x500.png'
+    if entity is Venue:
+        row['address'] = data['address'] or None
+    return row
+
+
+@bp.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTS)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']),
+              help='Format of the source, guessed from its extension by default.')
+@click.option('--batch-size', default=500, show_default=True, help='Rows written per statement.')
+@click.option('--no-copy', is_flag=True, help='Use multi-row INSERTs instead of COPY on postgres.')
+def import_rows(kind, source, format, batch_size, no_copy):
+    """Imports venues, artists or shows from a CSV or JSON lines file."""
+    format = format or ('jsonl' if source.name.endswith(('.jsonl', '.json')) else 'csv')
+    import forms
+    formName, entity, uniqueColumns = IMPORTS[kind]
+    form = getattr(forms, formName)
+    loader = importer.Loader(db.session, entity.__table__, uniqueColumns, use_copy=not no_copy)
+    started = datetime.now()
+    total = 0
+    rejected = 0
+
+    def reject(number, errors):
+        click.echo('line {}: {}'.format(number, errors), err=True)
+
+    checked = importer.validate(importer.read_rows(source, format), form, list_fields=('genres',))
+    for batch in importer.batches(checked, batch_size):
+        total += len(batch)
+        rows = []
+        numbers = {}
+        for number, data, errors in batch:
+            if errors:
+                reject(number, errors)
+                rejected += 1
+                continue
+            try:
+                row = import_columns(entity, data)
+            except (TypeError, ValueError) as error:
+                reject(number, error)
+                rejected += 1
+                continue
+            numbers[id(row)] = number
+            rows.append(row)
+
+        # shows are booked like on the schedule page, refusing unknown
+        # venues and artists and overlaps with their shows, existing or
+        # written by earlier lines
+        if entity is Show and rows:
+            booked, refused = check_bookings([(numbers[id(row)], row['venue_id'], row['artist_id'],
+                                               row['start_time'], row['end_time']) for row in rows])
+            for number, errors in refused:
+                reject(number, '; '.join(errors))
+                rejected += 1
+            bookedNumbers = {number for number, venue_id, artist_id, start_time, end_time in booked}
+            rows = [row for row in rows if numbers[id(row)] in bookedNumbers]
+        failed = set()
+        for row, error in loader.load(rows) if rows else ():
+            reject(numbers[id(row)], error)
+            rejected += 1
+            failed.add(id(row))
+
+        # the written venues and artists are found again by their facebook
+        # link, which the forms require, to link them to their genres
+        if entity is not Show and rows:
+            genres = {row['facebook_link']: row['genres'].split(',') for row in rows if id(row) not in failed}
+            written = db.session.query(entity.facebook_link, entity.id).filter(entity.facebook_link.in_(genres))
+            replace_genres(entity, {writtenId: genres[link] for link, writtenId in written})
+            db.session.commit()
+
+        # bulk writes skip the mapper events that keep the counters
+        if entity is Show and rows:
+            recount_upcoming_shows(Venue, {row['venue_id'] for row in rows})
+            recount_upcoming_shows(Artist, {row['artist_id'] for row in rows})
+            db.session.commit()
+
+    # any page may show the imported rows, and running workers rebuild
+    # their suggestions within SUGGEST_MAX_AGE
+    if entity is not Artist:
+        refresh_venue_areas()
+    cache.clear()
+
+    elapsed = max((datetime.now() - started).total_seconds(), 0.001)
+    click.echo('{} rows in {:.1f}s ({:.0f} rows/s): {} inserted, {} updated, {} rejected'.format(
+        total, elapsed, total / elapsed, loader.inserted, loader.updated, rejected))
+
+
+@bp.cli.command('build-assets')
+def build_assets():
+    """Writes the hashed and precompressed static files and bundles."""
+    manifest = assets.build()
+    click.echo('{} files and {} bundles written to {}'.format(
+        len(manifest) - len(assets.bundles), len(assets.bundles), assets.dist_folder))
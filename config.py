@@ -1,13 +1,104 @@
 import os
-SECRET_KEY = os.urandom(32)
+from datetime import timedelta
+
+# Signs the sessions, so every worker of a server needs the same one. Only
+# the development server makes one up when it is not set.
+SECRET_KEY = os.environ.get('SECRET_KEY')
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Enable debug mode with FLASK_DEBUG=1
+DEBUG = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true')
+
+# File the app logs to outside debug and testing, relative to this folder
+# rather than the working directory, or empty for none
+ERROR_LOG = 'error.log'
 
 # Connect to the database
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://localhost:5432/fyyur')
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Read replicas of the database, e.g. DATABASE_REPLICA_URLS=postgresql://a/fyyur,postgresql://b/fyyur.
+# Read-only requests are spread over them, see replicas.py. They are
+# checked every REPLICA_CHECK_INTERVAL seconds, and users read from the
+# primary for READ_YOUR_WRITES_SECONDS after a write of theirs.
+DATABASE_REPLICAS = [uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+REPLICA_CHECK_INTERVAL = 10
+READ_YOUR_WRITES_SECONDS = 10
+
+# Connection pool of the database: connections kept open, extra ones
+# opened under load, seconds to wait for one before giving up, and seconds
+# after which a connection is replaced. Pre-ping checks a connection is
+# alive before handing it out.
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 30
+DB_POOL_RECYCLE = 1800
+DB_POOL_PRE_PING = True
+
+# Milliseconds after which Postgres cancels a statement, 0 for no limit.
+# The flask commands, e.g. import, export or refresh-venue-areas, go
+# through whole tables and use DB_CLI_STATEMENT_TIMEOUT instead, no limit
+# by default.
+DB_STATEMENT_TIMEOUT = 10000
+DB_CLI_STATEMENT_TIMEOUT = 0
+
+# Set when connecting through PgBouncer in transaction pooling mode, e.g.
+# FYYUR_DB_PGBOUNCER=true: no server-side prepared statements, and the
+# statement timeout is set per transaction
+DB_PGBOUNCER = False
+
+# ASGI mode, see asgi.py: the database of the async engine, by default
+# SQLALCHEMY_DATABASE_URI with its async driver, and the threads running
+# the views that have no coroutine
+ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URL')
+ASGI_THREADS = 8
+
+# Locale of the datetime filter of the templates, and how many formatted
+# datetimes it remembers
+DATETIME_LOCALE = 'en_US'
+DATETIME_CACHE_SIZE = 4096
+
+# Number of past shows listed per page on the venue and artist pages
+PAST_SHOWS_PER_PAGE = 10
+
+# Number of rows per page on the /venues, /artists and /shows listings
+ITEMS_PER_PAGE = 50
+
+# Number of rows fetched at a time from the server-side cursor of exports
+EXPORT_BATCH_SIZE = 1000
+
+# Length of shows scheduled without a duration, and the longest one that
+# can be scheduled
+SHOW_DEFAULT_DURATION = timedelta(hours=2)
+SHOW_MAX_DURATION = timedelta(hours=24)
+
+# How far back 'flask rollover-counters' looks for shows that started
+COUNTER_ROLLOVER_WINDOW = timedelta(hours=6)
+
+# Response cache of the read-only pages: 'memory' (per process), 'redis'
+# (shared, needs the redis package) or None to turn it off. Servers with
+# several workers need 'redis', a write only invalidates the memory cache
+# of the process making it, see cache.py.
+CACHE_TYPE = 'memory'
+CACHE_DEFAULT_TIMEOUT = 60
+CACHE_MAX_ENTRIES = 1024
+CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+# Template fragments cached with {% cache %}, keyed by the version of what
+# they show, and the size of their per process LRU
+CACHE_FRAGMENT_TIMEOUT = 3600
+CACHE_FRAGMENT_MAX_ENTRIES = 8192
+
+# Seconds after which a worker rebuilds its autocomplete index, so that it
+# picks up names written by other processes
+SUGGEST_MAX_AGE = 300
 
+# Bearer token of the /_metrics and /_cache endpoints, which are not found
+# while it is not set. Prometheus sends it with authorization.credentials.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
 
-# IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://alexanderson@localhost:5432/fyyur'
+# Requests running more queries or spending longer in the database than
+# this are logged with their slowest statements
+SLOW_REQUEST_QUERIES = 25
+SLOW_REQUEST_DB_MS = 200
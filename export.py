@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+# Streaming dumps of query results as JSON lines or CSV. Rows are turned
+# into lines one at a time and grouped into chunks of a few kilobytes, so
+# a dump of any size holds only one chunk in memory, whether it goes to
+# an HTTP response or to a file.
+
+MIMETYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def lines(rows, columns, format):
+    # yields the lines of rows in format, with a header line for CSV
+    if format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_value(getattr(row, column)) for column in columns])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    elif format == 'jsonl':
+        for row in rows:
+            yield json.dumps({column: _value(getattr(row, column)) for column in columns}) + '\n'
+    else:
+        raise ValueError('unknown format ' + format)
+
+
+def chunks(lines, size=64 * 1024):
+    # groups lines into encoded chunks of about size bytes
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk).encode('utf-8')
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk).encode('utf-8')
+
+
+def gzipped(chunks):
+    # compresses a stream of chunks into one gzip member
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
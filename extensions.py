@@ -0,0 +1,34 @@
+from flask import current_app
+from flask_moment import Moment
+from flask_sqlalchemy import SQLAlchemy
+from aio import AsyncDatabase
+from assets import Assets
+from cache import ResponseCache
+from metrics import Instrumentation
+from replicas import Replicas, RoutingSession
+from werkzeug.local import LocalProxy
+
+# The extensions of the app, created unbound so that the models, queries
+# and blueprints can import them, and bound to the app by create_app().
+# They keep the state of each app in app.extensions and find it through
+# current_app, so several apps can live in one process.
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+replicas = Replicas()
+# the async engine of the ASGI mode, bound by asgi.py only
+async_db = AsyncDatabase()
+moment = Moment()
+cache = ResponseCache()
+instrumentation = Instrumentation()
+
+# bundles built by `flask build-assets`, see assets.py
+assets = Assets()
+assets.bundle('css/app.css', ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+                              'css/main.responsive.css', 'css/main.quickfix.css'])
+assets.bundle('js/head.js', ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'])
+assets.bundle('js/app.js', ['js/libs/jquery-1.11.1.min.js', 'js/libs/bootstrap-3.1.1.min.js',
+                            'js/plugins.js', 'js/script.js'])
+
+# autocomplete index of venue and artist names of the current app, see
+# load_suggestions()
+suggestions = LocalProxy(lambda: current_app.extensions['suggestions'])
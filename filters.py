@@ -0,0 +1,44 @@
+from functools import lru_cache
+
+# Template filters. Babel and dateutil are only imported on the first
+# datetime formatted, which keeps them out of the startup of the app.
+
+# Babel patterns of the named formats, any other format is a pattern
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def datetime_pattern(format, locale):
+    # the compiled Babel pattern of a format and the locale to apply it in
+    import babel.dates
+    return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+
+def datetime_filter(cache_size, default_locale):
+    # the datetime filter formatting in default_locale unless told
+    # otherwise. A page lists the same few start times many times over, so
+    # the last cache_size formatted datetimes are remembered.
+    @lru_cache(maxsize=cache_size)
+    def formatted_datetime(value, format, locale):
+        if isinstance(value, str):
+            import dateutil.parser
+            value = dateutil.parser.parse(value)
+        pattern, babelLocale = datetime_pattern(format, locale)
+        return pattern.apply(value, babelLocale)
+
+    def format_datetime(value, format='medium', locale=None):
+        # formats the datetimes of the views, or ISO strings
+        if value is None:
+            return ''
+        return formatted_datetime(value, format, locale or default_locale)
+
+    format_datetime.cache = formatted_datetime
+    return format_datetime
+
+
+def init_app(app):
+    app.jinja_env.filters['datetime'] = datetime_filter(app.config['DATETIME_CACHE_SIZE'],
+                                                        app.config['DATETIME_LOCALE'])
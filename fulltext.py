@@ -0,0 +1,69 @@
+import re
+from sqlalchemy import DDL, Float, Integer, event, text
+
+# Full-text search over the name, city, state and genres of venues and
+# artists. On postgres the documents live in a GIN index over a tsvector
+# expression, on sqlite in an FTS5 table kept in sync by triggers. Both
+# are maintained by the database itself, so the create and edit handlers
+# don't need to know about them.
+
+SEARCH_COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def search_terms(term):
+    # every word of the search box is matched as a prefix, so the results
+    # narrow down while the user types
+    return re.findall(r'\w+', term.lower())
+
+
+def _tsvector(columns):
+    document = " || ' ' || ".join("coalesce({}, '')".format(column) for column in columns)
+    return "to_tsvector('simple', {})".format(document)
+
+
+def _fts_table(table):
+    return '{}_search'.format(table.name.lower())
+
+
+def install(table, columns=SEARCH_COLUMNS):
+    # registers the search index of table to be built along with it
+    fts = _fts_table(table)
+    listed = ', '.join(columns)
+    new = ', '.join('new.' + column for column in columns)
+    old = ', '.join('old.' + column for column in columns)
+
+    postgres = [
+        'CREATE INDEX "ix_{0}_search" ON "{0}" USING gin ({1})'.format(table.name, _tsvector(columns)),
+    ]
+    sqlite = [
+        "CREATE VIRTUAL TABLE {0} USING fts5({1}, content='{2}', content_rowid='id')".format(fts, listed, table.name),
+        'CREATE TRIGGER {0}_ai AFTER INSERT ON "{1}" BEGIN '
+        'INSERT INTO {0}(rowid, {2}) VALUES (new.id, {3}); END'.format(fts, table.name, listed, new),
+        'CREATE TRIGGER {0}_ad AFTER DELETE ON "{1}" BEGIN '
+        "INSERT INTO {0}({0}, rowid, {2}) VALUES ('delete', old.id, {3}); END".format(fts, table.name, listed, old),
+        'CREATE TRIGGER {0}_au AFTER UPDATE ON "{1}" BEGIN '
+        "INSERT INTO {0}({0}, rowid, {2}) VALUES ('delete', old.id, {3}); "
+        'INSERT INTO {0}(rowid, {2}) VALUES (new.id, {4}); END'.format(fts, table.name, listed, old, new),
+    ]
+    for statement in postgres:
+        event.listen(table, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+    for statement in sqlite:
+        event.listen(table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(table, 'before_drop', DDL('DROP TABLE IF EXISTS {}'.format(fts)).execute_if(dialect='sqlite'))
+
+
+def ranked_matches(table, terms, dialect, columns=SEARCH_COLUMNS):
+    # a selectable of the (id, rank) of every row of table matching all of
+    # terms, where a lower rank is a better match
+    if dialect == 'postgresql':
+        query = ' & '.join(term + ':*' for term in terms)
+        statement = text(
+            "SELECT id, -ts_rank({0}, to_tsquery('simple', :query)) AS rank "
+            'FROM "{1}" WHERE {0} @@ to_tsquery(\'simple\', :query)'.format(_tsvector(columns), table.name))
+    elif dialect == 'sqlite':
+        query = ' '.join('"{}"*'.format(term) for term in terms)
+        statement = text(
+            'SELECT rowid AS id, rank FROM {0} WHERE {0} MATCH :query'.format(_fts_table(table)))
+    else:
+        raise NotImplementedError('no full-text search for ' + dialect)
+    return statement.bindparams(query=query).columns(id=Integer, rank=Float)
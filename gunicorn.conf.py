@@ -0,0 +1,23 @@
+import gc
+import os
+
+# gunicorn settings, `gunicorn -c gunicorn.conf.py wsgi:app`. The app is
+# loaded and warmed up once in the master, then the workers are forked
+# from it and share its modules, templates and autocomplete index
+# copy-on-write.
+
+bind = os.environ.get('BIND', '0.0.0.0:' + os.environ.get('PORT', '8000'))
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+preload_app = True
+
+
+def when_ready(server):
+    from app import warm_up
+    app = server.app.wsgi()
+    warm_up(app)
+    if workers > 1 and app.config['CACHE_TYPE'] == 'memory':
+        server.log.warning('each of the %d workers has its own response cache, invalidated only by its own '
+                           "writes; set FYYUR_CACHE_TYPE=redis", workers)
+    # objects allocated so far are left out of garbage collections, which
+    # would otherwise write to their pages in every worker and copy them
+    gc.freeze()
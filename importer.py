@@ -0,0 +1,186 @@
+import csv
+import json
+from sqlalchemy import bindparam, or_, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+
+# Streaming bulk import of venues, artists and shows. Rows are read one at
+# a time, validated with the same forms as the create pages and written in
+# batches, so memory stays flat however large the file is, but for the
+# ids of the rows written. Rows clashing with an existing row on one of
+# its unique columns update that row, unless an earlier row of the import
+# wrote it: rows of a file sharing a unique value are rejected but for
+# the first one.
+
+
+def read_rows(stream, format):
+    # yields (line number, row) from a CSV file with a header or from a
+    # file with one JSON object per line
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as error:
+                    yield number, error
+    else:
+        raise ValueError('unknown format ' + format)
+
+
+def validate(rows, form_class, list_fields=()):
+    # yields (line number, data, errors) of every row checked against
+    # form_class, data is None when the row is invalid
+    for number, row in rows:
+        if not isinstance(row, dict):
+            yield number, None, {'row': [str(row)]}
+            continue
+        formdata = MultiDict()
+        for name, value in row.items():
+            if value is None:
+                continue
+            if name in list_fields and isinstance(value, str):
+                value = [item.strip() for item in value.split(',') if item.strip()]
+            if isinstance(value, list):
+                formdata.setlist(name, [str(item) for item in value])
+            else:
+                formdata.add(name, str(value))
+        form = form_class(formdata=formdata, meta={'csrf': False})
+        if form.validate():
+            yield number, form.data, None
+        else:
+            yield number, None, form.errors
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_rows(connection, table, rows):
+    # writes rows to table with COPY on a psycopg 3 connection, which
+    # adapts the values like query parameters
+    columns = list(rows[0])
+    statement = 'COPY "{}" ({}) FROM STDIN'.format(table.name, ', '.join('"{}"'.format(column) for column in columns))
+    with connection.cursor() as cursor:
+        with cursor.copy(statement) as copy:
+            for row in rows:
+                copy.write_row([row[column] for column in columns])
+
+
+class Loader(object):
+    # writes batches of rows to table, upserting on unique_columns
+
+    def __init__(self, session, table, unique_columns=(), use_copy=True):
+        self.session = session
+        self.table = table
+        self.unique_columns = unique_columns
+        dialect = session.get_bind().dialect
+        # COPY goes through psycopg 3, the driver of requirements.txt
+        self.use_copy = use_copy and dialect.name == 'postgresql' and dialect.driver == 'psycopg'
+        self.inserted = 0
+        self.updated = 0
+        # ids of the rows written by the load so far
+        self.written = set()
+
+    def load(self, rows):
+        # writes rows in one transaction, returns the rows that could not
+        # be written with their error
+        rows, failed = self._deduplicate(rows)
+        return failed + self._load(rows)
+
+    def _load(self, rows):
+        if not rows:
+            return []
+        try:
+            inserted, updated, ids = self._write(rows)
+            self.session.commit()
+        except IntegrityError as error:
+            self.session.rollback()
+            if len(rows) == 1:
+                return [(rows[0], str(error.orig))]
+            # find the offending rows one at a time
+            failed = []
+            for row in rows:
+                failed.extend(self._load([row]))
+            return failed
+        self.inserted += inserted
+        self.updated += updated
+        self.written.update(ids)
+        return []
+
+    def _deduplicate(self, rows):
+        # the rows sharing no unique value with an earlier row of the load,
+        # and the others with their error
+        existing = self._existing(rows)
+        kept = []
+        failed = []
+        claimed = set()
+        claimedIds = set()
+        for row in rows:
+            values = [(column, row[column]) for column in self.unique_columns if row[column]]
+            rowIds = {existing[value] for value in values if value in existing}
+            clash = next((value for value in values if value in claimed
+                          or existing.get(value) in self.written or existing.get(value) in claimedIds), None)
+            if clash is not None:
+                failed.append((row, 'duplicate {} {} of an earlier row'.format(*clash)))
+                continue
+            claimed.update(values)
+            claimedIds.update(rowIds)
+            kept.append(row)
+        return kept, failed
+
+    def _write(self, rows):
+        # writes rows sharing no unique value, returns the number of rows
+        # inserted and updated and the ids of those rows
+        existing = self._existing(rows)
+        newRows = []
+        updates = {}
+        for row in rows:
+            values = [(column, row[column]) for column in self.unique_columns if row[column]]
+            rowId = next((existing[value] for value in values if value in existing), None)
+            if rowId is not None:
+                updates[rowId] = dict({'new_' + column: value for column, value in row.items()}, row_id=rowId)
+            else:
+                newRows.append(row)
+
+        ids = set(updates)
+        if newRows:
+            if self.use_copy:
+                copy_rows(self.session.connection().connection.driver_connection, self.table, newRows)
+            else:
+                self.session.execute(self.table.insert().values(newRows))
+            # rows without unique columns cannot be written twice
+            if self.unique_columns:
+                ids.update(self._existing(newRows).values())
+        if updates:
+            statement = self.table.update() \
+                .where(self.table.c.id == bindparam('row_id')) \
+                .values({column: bindparam('new_' + column) for column in rows[0]})
+            self.session.execute(statement, list(updates.values()))
+        return len(newRows), len(updates), ids
+
+    def _existing(self, rows):
+        # maps (column, value) to the id of the existing row holding it
+        conditions = []
+        for column in self.unique_columns:
+            values = {row[column] for row in rows if row[column]}
+            if values:
+                conditions.append(self.table.c[column].in_(values))
+        if not conditions:
+            return {}
+        columns = [self.table.c[column] for column in self.unique_columns]
+        existing = {}
+        for found in self.session.execute(select(self.table.c.id, *columns).where(or_(*conditions))):
+            for column in self.unique_columns:
+                existing[(column, getattr(found, column))] = found.id
+        return existing
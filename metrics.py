@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import deque
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request instrumentation. Every request records its number of SQL
+# queries, the time spent in the database and in templates and its
+# slowest statements. The numbers are sent back in a Server-Timing
+# header, aggregated for /_metrics in the Prometheus text format, and
+# requests over the configured thresholds are logged. /_metrics and
+# /_cache only answer requests bearing METRICS_TOKEN.
+
+
+class RequestMetrics(object):
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.pool_wait = 0.0
+        self.statements = []
+
+    def record_query(self, statement, duration):
+        self.queries += 1
+        self.db_time += duration
+        self.statements.append((duration, statement))
+        if len(self.statements) > self.keep:
+            self.statements.sort(reverse=True)
+            del self.statements[self.keep:]
+
+
+def _current():
+    return g.get('request_metrics') if has_app_context() else None
+
+
+def record_pool_wait(duration):
+    # adds the wait for a database connection to the current request
+    metrics = _current()
+    if metrics is not None:
+        metrics.pool_wait += duration
+
+
+class Aggregates(object):
+    # the totals of the requests of one app, and its extra /_metrics lines
+
+    def __init__(self, window):
+        self.window = window
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.durations = {}
+        self.collectors = []
+
+
+class Instrumentation(object):
+    # the instrumentation of the current app, whose Aggregates init_app()
+    # keeps in app.extensions['instrumentation']
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_REQUEST_QUERIES', 25)
+        app.config.setdefault('SLOW_REQUEST_DB_MS', 200)
+        app.config.setdefault('METRICS_WINDOW', 1000)
+        app.config.setdefault('METRICS_SLOWEST_STATEMENTS', 3)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.extensions['instrumentation'] = Aggregates(app.config['METRICS_WINDOW'])
+
+        # every engine, so that replicas and the CLI share the hooks, once
+        # however many apps are created
+        if not event.contains(Engine, 'before_cursor_execute', self._before_query):
+            event.listen(Engine, 'before_cursor_execute', self._before_query)
+            event.listen(Engine, 'after_cursor_execute', self._after_query)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    @property
+    def aggregates(self):
+        return current_app.extensions['instrumentation']
+
+    def add_collector(self, app, collector):
+        # collector returns extra lines for the /_metrics of app
+        app.extensions['instrumentation'].collectors.append(collector)
+
+    def _before_query(self, conn, cursor, statement, parameters, context, executemany):
+        # a connection runs one statement at a time, the start of a
+        # statement that failed is replaced by the next one
+        conn.info['query_started'] = time.perf_counter()
+
+    def _after_query(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('query_started', None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        metrics = _current()
+        if metrics is not None:
+            metrics.record_query(statement, duration)
+
+    def _before_render(self, sender, template, context, **extra):
+        g.template_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        metrics = _current()
+        if metrics is not None and 'template_started' in g:
+            metrics.template_time += time.perf_counter() - g.pop('template_started')
+
+    def _before_request(self):
+        g.request_metrics = RequestMetrics(current_app.config['METRICS_SLOWEST_STATEMENTS'])
+
+    def _after_request(self, response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None or request.endpoint == 'main.metrics':
+            return response
+        total = time.perf_counter() - metrics.started
+        response.headers['Server-Timing'] = ', '.join([
+            'db;dur={:.2f};desc="{} queries"'.format(metrics.db_time * 1000, metrics.queries),
+            'pool;dur={:.2f}'.format(metrics.pool_wait * 1000),
+            'tpl;dur={:.2f}'.format(metrics.template_time * 1000),
+            'total;dur={:.2f}'.format(total * 1000),
+        ])
+        self._aggregate(request.endpoint, response.status_code, metrics, total)
+
+        if metrics.queries > current_app.config['SLOW_REQUEST_QUERIES'] or \
+                metrics.db_time * 1000 > current_app.config['SLOW_REQUEST_DB_MS']:
+            slowest = sorted(metrics.statements, reverse=True)
+            current_app.logger.warning('slow request %s %s: %d queries, %.1fms in db, slowest: %s',
+                                    request.method, request.full_path, metrics.queries, metrics.db_time * 1000,
+                                    ' | '.join('{:.1f}ms {}'.format(duration * 1000, ' '.join(statement.split())[:300])
+                                               for duration, statement in slowest))
+        return response
+
+    def _aggregate(self, endpoint, status, metrics, total):
+        aggregates = self.aggregates
+        with aggregates.lock:
+            totals = aggregates.totals.setdefault((endpoint, status), [0, 0, 0.0, 0.0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += metrics.queries
+            totals[2] += total
+            totals[3] += metrics.db_time
+            totals[4] += metrics.template_time
+            totals[5] += metrics.pool_wait
+            aggregates.durations.setdefault(endpoint, deque(maxlen=aggregates.window)).append(total)
+
+    def render(self):
+        # the aggregates in the Prometheus text exposition format
+        aggregates = self.aggregates
+        with aggregates.lock:
+            totals = sorted(aggregates.totals.items(), key=lambda item: (str(item[0][0]), item[0][1]))
+            durations = {endpoint: sorted(window) for endpoint, window in aggregates.durations.items()}
+
+        lines = []
+
+        def family(name, kind, help, samples):
+            lines.append('# HELP {} {}'.format(name, help))
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for labels, value in samples:
+                labelText = ','.join('{}="{}"'.format(label, labelValue) for label, labelValue in labels)
+                lines.append('{}{{{}}} {}'.format(name, labelText, value))
+
+        def labels(key):
+            return (('endpoint', key[0]), ('status', key[1]))
+
+        family('fyyur_requests_total', 'counter', 'Requests served.',
+               [(labels(key), value[0]) for key, value in totals])
+        family('fyyur_db_queries_total', 'counter', 'SQL queries run by requests.',
+               [(labels(key), value[1]) for key, value in totals])
+        family('fyyur_request_seconds_total', 'counter', 'Time spent serving requests.',
+               [(labels(key), '{:.6f}'.format(value[2])) for key, value in totals])
+        family('fyyur_db_seconds_total', 'counter', 'Time spent in the database by requests.',
+               [(labels(key), '{:.6f}'.format(value[3])) for key, value in totals])
+        family('fyyur_template_seconds_total', 'counter', 'Time spent rendering templates by requests.',
+               [(labels(key), '{:.6f}'.format(value[4])) for key, value in totals])
+        family('fyyur_db_pool_wait_seconds_by_endpoint_total', 'counter',
+               'Time requests spent waiting for a database connection.',
+               [(labels(key), '{:.6f}'.format(value[5])) for key, value in totals])
+
+        quantiles = []
+        for endpoint, window in sorted(durations.items(), key=lambda item: str(item[0])):
+            for quantile in (0.5, 0.95, 0.99):
+                value = window[min(len(window) - 1, int(quantile * len(window)))]
+                quantiles.append(((('endpoint', endpoint), ('quantile', quantile)), '{:.6f}'.format(value)))
+        family('fyyur_request_seconds', 'gauge',
+               'Request duration quantiles over the last {} requests per endpoint.'.format(aggregates.window),
+               quantiles)
+
+        for collector in aggregates.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,34 @@
+"""empty message
+
+Revision ID: 5c7e0b2f9d18
+Revises: a41d9e3b7c05
+Create Date: 2020-05-18 10:47:31.284095
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c7e0b2f9d18'
+down_revision = 'a41d9e3b7c05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Artist', sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('Venue', sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+    # backfill from the shows, the app keeps the counters in step from here
+    # on. Show times are naive local times, like datetime.now() and unlike
+    # CURRENT_TIMESTAMP, which is UTC on sqlite.
+    now = sa.bindparam('now', datetime.now(), type_=sa.DateTime())
+    op.execute(sa.text('UPDATE "Venue" SET upcoming_shows_count = (SELECT count(*) FROM "Show" '
+                       'WHERE "Show".venue_id = "Venue".id AND "Show".start_time > :now)').bindparams(now))
+    op.execute(sa.text('UPDATE "Artist" SET upcoming_shows_count = (SELECT count(*) FROM "Show" '
+                       'WHERE "Show".artist_id = "Artist".id AND "Show".start_time > :now)').bindparams(now))
+
+def downgrade():
+    op.drop_column('Venue', 'upcoming_shows_count')
+    op.drop_column('Artist', 'upcoming_shows_count')
@@ -0,0 +1,47 @@
+"""empty message
+
+Revision ID: 7f3a1c9e5b24
+Revises: c3a8f5d2e619
+Create Date: 2020-05-24 16:20:37.604118
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3a1c9e5b24'
+down_revision = 'c3a8f5d2e619'
+branch_labels = None
+depends_on = None
+
+# the rows of the /venues page, see summary.py
+SELECT = (
+    'SELECT "Venue".id, "Venue".name, "Venue".city, "Venue".state, "Venue".updated_at, '
+    'count("Show".id) AS num_upcoming_shows '
+    'FROM "Venue" LEFT OUTER JOIN "Show" ON "Show".venue_id = "Venue".id AND "Show".start_time > :now '
+    'GROUP BY "Venue".id'
+)
+
+
+def upgrade():
+    op.create_table('VenueAreaSummary',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('num_upcoming_shows', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_VenueAreaSummary_state_city', 'VenueAreaSummary', ['state', 'city', 'name', 'id'],
+                    unique=False)
+    # show times are naive local times, like datetime.now()
+    now = sa.bindparam('now', datetime.now(), type_=sa.DateTime())
+    op.execute(sa.text('INSERT INTO "VenueAreaSummary" ' + SELECT).bindparams(now))
+
+
+def downgrade():
+    op.drop_index('ix_VenueAreaSummary_state_city', table_name='VenueAreaSummary')
+    op.drop_table('VenueAreaSummary')
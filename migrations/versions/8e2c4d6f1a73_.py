@@ -0,0 +1,44 @@
+"""empty message
+
+Revision ID: 8e2c4d6f1a73
+Revises: 3b1f7a9c2d41
+Create Date: 2020-05-14 21:03:52.118604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2c4d6f1a73'
+down_revision = '3b1f7a9c2d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_Venue_state_city', 'Venue', ['state', 'city', 'name', 'id'], unique=False)
+    op.create_index('ix_Artist_name', 'Artist', ['name', 'id'], unique=False)
+    op.create_index('ix_Venue_name_lower', 'Venue', [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_Artist_name_lower', 'Artist', [sa.text('lower(name)')], unique=False)
+    # trigram indexes serve the ilike('%term%') name searches on postgres
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_Venue_name_trgm', 'Venue', ['name'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+        op.create_index('ix_Artist_name_trgm', 'Artist', ['name'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_Artist_name_trgm', table_name='Artist')
+        op.drop_index('ix_Venue_name_trgm', table_name='Venue')
+    op.drop_index('ix_Artist_name_lower', table_name='Artist')
+    op.drop_index('ix_Venue_name_lower', table_name='Venue')
+    op.drop_index('ix_Artist_name', table_name='Artist')
+    op.drop_index('ix_Venue_state_city', table_name='Venue')
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
@@ -0,0 +1,60 @@
+"""empty message
+
+Revision ID: a41d9e3b7c05
+Revises: 8e2c4d6f1a73
+Create Date: 2020-05-16 14:22:09.650731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41d9e3b7c05'
+down_revision = '8e2c4d6f1a73'
+branch_labels = None
+depends_on = None
+
+# must stay identical to the expression searched by fulltext.ranked_matches
+DOCUMENT = ("to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(city, '') || ' ' || "
+            "coalesce(state, '') || ' ' || coalesce(genres, ''))")
+
+# the fts5 tables and triggers of fulltext.install() on sqlite
+COLUMNS = 'name, city, state, genres'
+NEW = 'new.name, new.city, new.state, new.genres'
+OLD = 'old.name, old.city, old.state, old.genres'
+TABLES = (('Venue', 'venue_search'), ('Artist', 'artist_search'))
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('CREATE INDEX "ix_Venue_search" ON "Venue" USING gin ({})'.format(DOCUMENT))
+        op.execute('CREATE INDEX "ix_Artist_search" ON "Artist" USING gin ({})'.format(DOCUMENT))
+    elif dialect == 'sqlite':
+        for table, fts in TABLES:
+            op.execute("CREATE VIRTUAL TABLE {} USING fts5({}, content='{}', content_rowid='id')"
+                       .format(fts, COLUMNS, table))
+            op.execute('CREATE TRIGGER {0}_ai AFTER INSERT ON "{1}" BEGIN '
+                       'INSERT INTO {0}(rowid, {2}) VALUES (new.id, {3}); END'.format(fts, table, COLUMNS, NEW))
+            op.execute('CREATE TRIGGER {0}_ad AFTER DELETE ON "{1}" BEGIN '
+                       "INSERT INTO {0}({0}, rowid, {2}) VALUES ('delete', old.id, {3}); END"
+                       .format(fts, table, COLUMNS, OLD))
+            op.execute('CREATE TRIGGER {0}_au AFTER UPDATE ON "{1}" BEGIN '
+                       "INSERT INTO {0}({0}, rowid, {2}) VALUES ('delete', old.id, {3}); "
+                       'INSERT INTO {0}(rowid, {2}) VALUES (new.id, {4}); END'
+                       .format(fts, table, COLUMNS, OLD, NEW))
+            # indexes the rows already there
+            op.execute("INSERT INTO {0}({0}) VALUES ('rebuild')".format(fts))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_Artist_search', table_name='Artist')
+        op.drop_index('ix_Venue_search', table_name='Venue')
+    elif dialect == 'sqlite':
+        for table, fts in TABLES:
+            for trigger in ('ai', 'ad', 'au'):
+                op.execute('DROP TRIGGER IF EXISTS {}_{}'.format(fts, trigger))
+            op.execute('DROP TABLE IF EXISTS {}'.format(fts))
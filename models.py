@@ -0,0 +1,145 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, DDL
+import fulltext
+import summary
+from extensions import db
+
+# The venues, artists, shows and genres, and the mapper events keeping the
+# upcoming show counters of venues and artists in step with their shows.
+
+STATES = ['AL','AK','AZ','AR','CA','CO','CT','DE','DC','FL','GA','HI','ID','IL','IN','IA','KS','KY','LA','ME','MT','NE','NV','NH','NJ','NM','NY','NC','ND','OH','OK','OR','MD','MA','MI','MN','MS','MO','PA','RI','SC','SD','TN','TX','UT','VT','VA','WA','WV','WI','WY']
+
+
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    address = db.Column(db.String(120), unique=True)
+    phone = db.Column(db.String(120), unique=True)
+    image_link = db.Column(db.String(500))
+    # the names of genres joined with commas, kept for full-text search
+    genre_names = db.Column('genres', db.Text)
+    facebook_link = db.Column(db.String(120), unique=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+    shows = db.relationship('Show', backref='Venue', lazy=True)
+    genres = db.relationship('Genre', secondary='VenueGenre', order_by='Genre.name', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_Venue_state_city', state, city, name, id),
+        db.Index('ix_Venue_name_lower', db.func.lower(name)),
+        db.Index('ix_Venue_name_trgm', name, postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    phone = db.Column(db.String(120), unique=True)
+    # the names of genres joined with commas, kept for full-text search
+    genre_names = db.Column('genres', db.Text)
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120), unique=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now())
+    shows = db.relationship('Show', backref='Artist', lazy=True)
+    genres = db.relationship('Genre', secondary='ArtistGenre', order_by='Genre.name', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_Artist_name', name, id),
+        db.Index('ix_Artist_name_lower', db.func.lower(name)),
+        db.Index('ix_Artist_name_trgm', name, postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+
+
+def default_end_time(context):
+    # shows created without an end last SHOW_DEFAULT_DURATION
+    start_time = context.get_current_parameters()['start_time']
+    return start_time + current_app.config['SHOW_DEFAULT_DURATION'] if start_time is not None else None
+
+
+class Show(db.Model):
+    __tablename__ = 'Show'
+
+    id = db.Column(db.Integer, primary_key=True)
+    start_time = db.Column('start_time', db.DateTime, index=True)
+    end_time = db.Column(db.DateTime, nullable=False, default=default_end_time)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now,
+                           server_default=db.func.now(), index=True)
+
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', venue_id, start_time),
+        db.Index('ix_Show_artist_id_start_time', artist_id, start_time),
+    )
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+
+# the second index of each association table finds the venues or artists
+# of a genre
+venue_genres = db.Table(
+    'VenueGenre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_VenueGenre_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genres = db.Table(
+    'ArtistGenre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_ArtistGenre_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+
+def count_upcoming_show(connection, show, delta):
+    # keeps upcoming_shows_count of the venue and artist of show in step,
+    # inside the transaction that writes the show, and bumps their
+    # updated_at since their pages list the show
+    if show.start_time is None or show.start_time <= datetime.now():
+        delta = 0
+    for entity, entity_id in ((Venue, show.venue_id), (Artist, show.artist_id)):
+        connection.execute(entity.__table__.update()
+                           .where(entity.__table__.c.id == entity_id)
+                           .values(upcoming_shows_count=entity.__table__.c.upcoming_shows_count + delta))
+
+
+@event.listens_for(Show, 'after_insert')
+def show_inserted(mapper, connection, show):
+    count_upcoming_show(connection, show, 1)
+
+
+@event.listens_for(Show, 'after_delete')
+def show_deleted(mapper, connection, show):
+    count_upcoming_show(connection, show, -1)
+
+
+# the trigram name indexes need pg_trgm on postgres
+event.listen(db.metadata, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+fulltext.install(Venue.__table__)
+fulltext.install(Artist.__table__)
+summary.install(Venue.__table__, Show.__table__)
+
+# association table of the genres of venues and of artists
+GENRE_TABLES = {Venue: venue_genres, Artist: artist_genres}
@@ -0,0 +1,148 @@
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+import metrics
+
+# Connection pooling of the database engines. The pool sizes, timeouts,
+# pre-ping and the statement timeout come from the DB_ settings of
+# config.py. With DB_PGBOUNCER the engines suit PgBouncer in transaction
+# pooling mode: the drivers keep no server-side prepared statements,
+# which would not survive a switch of server connection, and the
+# statement timeout is set per transaction rather than per connection.
+#
+# The time spent waiting for a connection of a pool, including opening a
+# new one, is recorded for the /_metrics of the app and the Server-Timing
+# header.
+
+
+class CheckoutStats(object):
+    # the checkouts of the engines of one app, kept by configure() in
+    # app.extensions['pool_stats']
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait = 0.0
+        self.timeouts = 0
+        self.engines = {}
+
+    def record(self, duration, timedOut):
+        with self._lock:
+            self.checkouts += 1
+            self.wait += duration
+            self.timeouts += timedOut
+
+    def metric_lines(self):
+        with self._lock:
+            checkouts, wait, timeouts = self.checkouts, self.wait, self.timeouts
+        lines = [
+            '# HELP fyyur_db_pool_checkouts_total Connections checked out of the pools.',
+            '# TYPE fyyur_db_pool_checkouts_total counter',
+            'fyyur_db_pool_checkouts_total {}'.format(checkouts),
+            '# HELP fyyur_db_pool_wait_seconds_total Time spent waiting for a connection of the pools.',
+            '# TYPE fyyur_db_pool_wait_seconds_total counter',
+            'fyyur_db_pool_wait_seconds_total {:.6f}'.format(wait),
+            '# HELP fyyur_db_pool_timeouts_total Checkouts that gave up after DB_POOL_TIMEOUT.',
+            '# TYPE fyyur_db_pool_timeouts_total counter',
+            'fyyur_db_pool_timeouts_total {}'.format(timeouts),
+            '# HELP fyyur_db_pool_connections Connections of each pool by state.',
+            '# TYPE fyyur_db_pool_connections gauge',
+        ]
+        # the current pool of each engine, dispose() replaces it
+        pools = [(name, engine.pool) for name, engine in sorted(self.engines.items())
+                 if isinstance(engine.pool, TimedQueuePool)]
+        for name, pool in pools:
+            for state, value in (('checked_out', pool.checkedout()), ('idle', pool.checkedin()),
+                                 ('overflow', max(pool.overflow(), 0))):
+                lines.append('fyyur_db_pool_connections{{pool="{}",state="{}"}} {}'.format(name, state, value))
+        return lines
+
+
+def metric_lines():
+    # the checkouts and connections of the engines of the current app
+    return current_app.extensions['pool_stats'].metric_lines()
+
+
+def record_checkout(duration, timedOut):
+    # counts a checkout for the current app, those outside of an app
+    # context, e.g. of scripts, are not counted
+    if has_app_context():
+        stats = current_app.extensions.get('pool_stats')
+        if stats is not None:
+            stats.record(duration, timedOut)
+    metrics.record_pool_wait(duration)
+
+
+class TimedQueuePool(QueuePool):
+    # a QueuePool timing its checkouts
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timedOut = False
+        try:
+            return super(TimedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            timedOut = True
+            raise
+        finally:
+            record_checkout(time.perf_counter() - started, timedOut)
+
+
+def _is_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config, uri=None):
+    # the create_engine() arguments of the database at uri, the main one
+    # by default
+    url = make_url(uri or config['SQLALCHEMY_DATABASE_URI'])
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    # an in-memory SQLite database lives in its single connection
+    if _is_memory(url):
+        return options
+    # async engines keep their own adapted pool class
+    if not url.get_dialect().is_async:
+        options['poolclass'] = TimedQueuePool
+    options.update(pool_size=config['DB_POOL_SIZE'],
+                   max_overflow=config['DB_MAX_OVERFLOW'],
+                   pool_timeout=config['DB_POOL_TIMEOUT'],
+                   pool_recycle=config['DB_POOL_RECYCLE'])
+    if url.get_backend_name() != 'postgresql':
+        return options
+
+    driver = url.get_driver_name()
+    connectArgs = {}
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if config['DB_PGBOUNCER']:
+        if driver == 'asyncpg':
+            connectArgs['statement_cache_size'] = 0
+            options['prepared_statement_cache_size'] = 0
+        elif driver == 'psycopg':
+            connectArgs['prepare_threshold'] = None
+    elif timeout and driver == 'asyncpg':
+        connectArgs['server_settings'] = {'statement_timeout': str(timeout)}
+    elif timeout:
+        connectArgs['options'] = '-c statement_timeout={}'.format(int(timeout))
+    if connectArgs:
+        options['connect_args'] = connectArgs
+    return options
+
+
+def configure(app, engine, name='default'):
+    # registers engine for the /_metrics of app, and behind PgBouncer sets
+    # the statement timeout at the start of every transaction, since
+    # session settings would leak to other clients of the server connection
+    app.extensions.setdefault('pool_stats', CheckoutStats()).engines[name] = engine
+    config = app.config
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if config['DB_PGBOUNCER'] and timeout and engine.dialect.name == 'postgresql':
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            # straight on the driver, the transaction being begun is not
+            # usable from this event yet
+            cursor = connection.connection.cursor()
+            cursor.execute('SET LOCAL statement_timeout = {}'.format(int(timeout)))
+            cursor.close()
@@ -0,0 +1,557 @@
+import base64
+import hashlib
+import json
+from datetime import datetime, timedelta
+from itertools import groupby
+from flask import Response, abort, current_app, make_response, request, session, url_for
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.http import is_resource_modified
+import fulltext
+import schedule
+import summary
+from extensions import cache, db, suggestions
+from models import GENRE_TABLES, Artist, Genre, Show, Venue, artist_genres, venue_genres
+
+# The queries of the views and commands, and the helpers they share:
+# conditional responses, keyset pagination, scheduling and genres.
+
+
+def page_query(entity, entity_id):
+    # a venue or artist with its genres, the start of its latest show
+    # that already started and the latest edit of the artists or venues it
+    # has shows with, see validators()
+    if entity is Venue:
+        counterpart, showColumn, counterpartColumn = Artist, Show.venue_id, Show.artist_id
+    else:
+        counterpart, showColumn, counterpartColumn = Venue, Show.artist_id, Show.venue_id
+    latestStarted = db.select(db.func.max(Show.start_time)) \
+        .filter(showColumn == entity.id, Show.start_time <= datetime.now()) \
+        .scalar_subquery()
+    latestCounterpart = db.select(db.func.max(counterpart.updated_at)) \
+        .join(Show, counterpartColumn == counterpart.id) \
+        .filter(showColumn == entity.id) \
+        .scalar_subquery()
+    return db.select(entity, latestStarted, latestCounterpart) \
+        .options(db.joinedload(entity.genres)) \
+        .filter(entity.id == entity_id)
+
+
+def page_validators(entity, entity_id):
+    # fetches a venue or artist with the ETag and Last-Modified of its page
+    return validators(entity, entity_id, db.session.execute(page_query(entity, entity_id)).unique().first())
+
+
+def validators(entity, entity_id, row):
+    # the entity of a page_query() row with the ETag and Last-Modified of
+    # its page. Besides edits the page changes whenever one of its shows
+    # moves from upcoming to past, so the start of the latest show that
+    # already started counts as a modification too, and whenever an artist
+    # or venue it lists is edited, e.g. renamed.
+    if row is None:
+        abort(404)
+    specificEntity, latestStarted, latestCounterpart = row
+
+    # pages showing flashed messages are personal, they get no validators
+    if '_flashes' in session:
+        return specificEntity, None, None
+    changes = [specificEntity.updated_at, latestStarted, latestCounterpart]
+    lastModified = max(change for change in changes if change is not None)
+    version = '{}:{}:{}:{}'.format(entity.__tablename__, entity_id,
+                                   ':'.join(change.isoformat() if change else '' for change in changes),
+                                   request.args.get('page', 1, type=int))
+    return specificEntity, hashlib.sha1(version.encode()).hexdigest(), lastModified
+
+
+def not_modified(etag, lastModified):
+    # a 304 response when the client already holds this version of the page
+    if etag is None or is_resource_modified(request.environ, etag=etag, last_modified=lastModified):
+        return None
+    return with_validators(Response(status=304), etag, lastModified)
+
+
+def with_validators(response, etag, lastModified):
+    if etag is not None:
+        response = make_response(response)
+        response.set_etag(etag)
+        response.last_modified = lastModified
+    return response
+
+
+def show_listing_query(entity, entity_id, page=1):
+    # the upcoming shows and one page of past shows for a venue or an
+    # artist, joined with the other side of the show
+    if entity is Venue:
+        counterpart, entity_column, counterpart_column = Artist, Show.venue_id, Show.artist_id
+    else:
+        counterpart, entity_column, counterpart_column = Venue, Show.artist_id, Show.venue_id
+    per_page = current_app.config['PAST_SHOWS_PER_PAGE']
+    is_upcoming = Show.start_time > datetime.now()
+    ranked = db.session.query(
+        Show.start_time,
+        counterpart.id.label('id'),
+        counterpart.name.label('name'),
+        counterpart.image_link.label('image_link'),
+        is_upcoming.label('is_upcoming'),
+        db.func.row_number().over(partition_by=is_upcoming, order_by=Show.start_time).label('soonest'),
+        db.func.row_number().over(partition_by=is_upcoming, order_by=Show.start_time.desc()).label('latest'),
+        db.func.count(Show.id).over(partition_by=is_upcoming).label('total')
+    ).join(counterpart, counterpart_column == counterpart.id) \
+        .filter(entity_column == entity_id) \
+        .subquery()
+
+    # upcoming shows soonest first, past shows most recent first
+    return db.session.query(ranked) \
+        .filter(db.or_(ranked.c.is_upcoming,
+                       ranked.c.latest.between((page - 1) * per_page + 1, page * per_page))) \
+        .order_by(ranked.c.is_upcoming.desc(),
+                  db.case((ranked.c.is_upcoming, ranked.c.soonest), else_=ranked.c.latest))
+
+
+def show_listing(entity, entity_id, page=1):
+    # fetches the show sections of a venue or artist page in one query
+    page = max(page, 1)
+    return listing_sections(entity, show_listing_query(entity, entity_id, page).all(), page)
+
+
+def listing_sections(entity, rows, page):
+    # the upcoming and past show sections of show_listing_query() rows
+    per_page = current_app.config['PAST_SHOWS_PER_PAGE']
+    listing = {
+        "upcoming_shows": [],
+        "upcoming_shows_count": 0,
+        "past_shows": [],
+        "past_shows_count": 0,
+        "past_shows_page": page,
+        "past_shows_pages": 0
+    }
+    key = 'artist' if entity is Venue else 'venue'
+    for upcoming, shows in groupby(rows, key=lambda row: bool(row.is_upcoming)):
+        shows = list(shows)
+        section = 'upcoming_shows' if upcoming else 'past_shows'
+        listing[section] = [{
+            key + "_id": show.id,
+            key + "_name": show.name,
+            key + "_image_link": show.image_link,
+            "start_time": show.start_time
+        } for show in shows]
+        listing[section + '_count'] = shows[0].total
+    listing['past_shows_pages'] = -(-listing['past_shows_count'] // per_page)
+    return listing
+
+
+def search_query(entity, searchTerm):
+    # venues or artists matching searchTerm, best match first, each with
+    # its number of upcoming shows
+    query = db.session.query(entity.id, entity.name, entity.updated_at,
+                             entity.upcoming_shows_count.label('num_upcoming_shows'))
+
+    terms = fulltext.search_terms(searchTerm)
+    if not terms:
+        return query.order_by(entity.name, entity.id)
+    matches = fulltext.ranked_matches(entity.__table__, terms, db.engine.dialect.name).subquery()
+    return query.join(matches, matches.c.id == entity.id) \
+        .order_by(matches.c.rank, entity.id)
+
+
+def load_suggestions():
+    # fills the autocomplete index from the database on first use, and
+    # again once it is older than SUGGEST_MAX_AGE to pick up the writes of
+    # other processes, e.g. flask import
+    if not suggestions.built or suggestions.age() > current_app.config['SUGGEST_MAX_AGE']:
+        rows = [('venue', venue.id, venue.name) for venue in db.session.query(Venue.id, Venue.name)]
+        rows += [('artist', artist.id, artist.name) for artist in db.session.query(Artist.id, Artist.name)]
+        suggestions.build(rows)
+    return suggestions
+
+
+# sort keys of the paginated listings
+VENUE_AREAS_KEY = (Venue.state, Venue.city, Venue.name, Venue.id)
+VENUE_SUMMARY_KEY = (summary.VENUE_AREAS.c.state, summary.VENUE_AREAS.c.city, summary.VENUE_AREAS.c.name,
+                     summary.VENUE_AREAS.c.id)
+ARTISTS_KEY = (Artist.name, Artist.id)
+SHOWS_KEY = (Show.start_time, Show.id)
+
+
+def venue_areas_query():
+    # every venue with its upcoming show count, from the summary
+    return db.session.query(summary.VENUE_AREAS)
+
+
+def refresh_venue_areas(ids=None):
+    # recomputes the rows of the summary behind /venues of the venues ids
+    # after a write to them or their shows, or every row. A failure is
+    # logged and left to the next scheduled refresh, the write itself went
+    # through.
+    try:
+        summary.refresh(db.session, Venue.__table__, Show.__table__, ids)
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        current_app.logger.exception('refreshing the venue areas failed')
+
+
+def actual_upcoming_counts(entity):
+    # a subquery of the (id, count) of upcoming shows per venue or artist
+    showColumn = Show.venue_id if entity is Venue else Show.artist_id
+    return db.session.query(showColumn.label('id'), db.func.count(Show.id).label('count')) \
+        .filter(Show.start_time > datetime.now()) \
+        .group_by(showColumn) \
+        .subquery()
+
+
+def counter_drift(entity):
+    # the (id, stored, actual) of every venue or artist whose
+    # upcoming_shows_count is out of step with its shows
+    actual = actual_upcoming_counts(entity)
+    actualCount = db.func.coalesce(actual.c.count, 0)
+    return db.session.query(entity.id, entity.upcoming_shows_count, actualCount) \
+        .outerjoin(actual, actual.c.id == entity.id) \
+        .filter(entity.upcoming_shows_count != actualCount) \
+        .order_by(entity.id) \
+        .all()
+
+
+def recount_upcoming_shows(entity, ids=None):
+    # recomputes upcoming_shows_count of the given venues or artists, or of
+    # all of them, from their shows
+    showColumn = Show.venue_id if entity is Venue else Show.artist_id
+    actual = db.session.query(db.func.count(Show.id)) \
+        .filter(showColumn == entity.id, Show.start_time > datetime.now()) \
+        .scalar_subquery()
+    query = entity.query
+    if ids is not None:
+        query = query.filter(entity.id.in_(ids))
+    return query.update({entity.upcoming_shows_count: actual}, synchronize_session=False)
+
+
+def shows_query(include_past=False):
+    # the columns the show tiles render and their versions, from one
+    # Show/Venue/Artist join
+    query = db.session.query(Show.id,
+                             Show.start_time,
+                             Show.updated_at,
+                             Venue.id.label('venue_id'),
+                             Venue.name.label('venue_name'),
+                             Venue.updated_at.label('venue_updated_at'),
+                             Artist.id.label('artist_id'),
+                             Artist.name.label('artist_name'),
+                             Artist.image_link.label('artist_image_link'),
+                             Artist.updated_at.label('artist_updated_at')) \
+        .join(Venue, Show.venue_id == Venue.id) \
+        .join(Artist, Show.artist_id == Artist.id)
+    if not include_past:
+        query = query.filter(Show.start_time > datetime.now())
+    return query
+
+
+def show_tile(show):
+    # the fields of a row of shows_query rendered by layouts/show_tile.html
+    return {
+        "id": show.id,
+        "venue_id": show.venue_id,
+        "venue_name": show.venue_name,
+        "artist_id": show.artist_id,
+        "artist_name": show.artist_name,
+        "artist_image_link": show.artist_image_link,
+        "start_time": show.start_time,
+        "version": (show.updated_at, show.venue_updated_at, show.artist_updated_at)
+    }
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, columns):
+    # the key of an encode_cursor() cursor, aborts with 400 for a cursor
+    # that is not one of those, e.g. one edited by hand
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [cursor_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        abort(400, 'invalid cursor')
+
+
+def cursor_value(column, value):
+    # a value of a cursor as the type of its column, raises ValueError or
+    # TypeError for one of another type
+    if value is None:
+        return None
+    if isinstance(column.type, db.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(value, bool) or not isinstance(value, column.type.python_type):
+        raise TypeError('{} is not a {}'.format(value, column.type))
+    return value
+
+
+def keyset_page(query, columns):
+    # pages through query ordered by columns using the ?after= / ?before=
+    # cursors of the current request. Rows are found by seeking past the
+    # cursor key, so every page costs the same no matter how deep it is.
+    per_page = current_app.config['ITEMS_PER_PAGE']
+    after = request.args.get('after')
+    before = request.args.get('before')
+
+    def key_of(values):
+        return db.tuple_(*[db.literal(value, column.type) for column, value in zip(columns, values)])
+
+    if before:
+        rows = query.filter(db.tuple_(*columns) < key_of(decode_cursor(before, columns))) \
+            .order_by(*[column.desc() for column in columns]) \
+            .limit(per_page + 1) \
+            .all()
+        has_prev, has_next = len(rows) > per_page, True
+        rows = rows[:per_page][::-1]
+    else:
+        if after:
+            query = query.filter(db.tuple_(*columns) > key_of(decode_cursor(after, columns)))
+        rows = query.order_by(*columns).limit(per_page + 1).all()
+        has_prev, has_next = bool(after), len(rows) > per_page
+        rows = rows[:per_page]
+
+    def page_url(**cursor):
+        args = request.args.to_dict()
+        args.pop('after', None)
+        args.pop('before', None)
+        args.update(cursor)
+        return url_for(request.endpoint, **dict(request.view_args, **args))
+
+    pagination = {"prev": None, "next": None}
+    if rows and has_prev:
+        pagination['prev'] = page_url(before=encode_cursor([getattr(rows[0], column.key) for column in columns]))
+    if rows and has_next:
+        pagination['next'] = page_url(after=encode_cursor([getattr(rows[-1], column.key) for column in columns]))
+    return rows, pagination
+
+
+# columns of the rows of /export/shows and flask export, and its filters
+EXPORT_COLUMNS = ('id', 'start_time', 'end_time', 'venue_id', 'venue_name', 'artist_id', 'artist_name', 'updated_at')
+EXPORT_FILTERS = ('start_after', 'start_before', 'modified_since')
+
+
+def local_time(value):
+    # a datetime as the naive local time the database stores, converting
+    # one given with a UTC offset, e.g. 2020-01-01T00:00:00+05:00
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def export_filters(values):
+    # parses the export filters present in values, raises ValueError for
+    # one that is not a date
+    import dateutil.parser
+    filters = {}
+    for name in EXPORT_FILTERS:
+        if values.get(name):
+            try:
+                filters[name] = local_time(dateutil.parser.parse(values[name]))
+            except (ValueError, OverflowError):
+                raise ValueError('{} is not a date: {}'.format(name, values[name]))
+    return filters
+
+
+def export_shows_query(start_after=None, start_before=None, modified_since=None):
+    # every show matching the filters, streamed from a server-side cursor
+    # in batches of EXPORT_BATCH_SIZE rows. A row changes with the edits of
+    # its venue and artist too, whose names it carries, so its updated_at
+    # is the latest of the three. Deleted shows are not part of
+    # incremental exports.
+    greatest = db.func.greatest if db.engine.dialect.name == 'postgresql' else db.func.max
+    updated_at = greatest(Show.updated_at, Venue.updated_at, Artist.updated_at, type_=db.DateTime)
+    query = db.session.query(Show.id,
+                             Show.start_time,
+                             Show.end_time,
+                             updated_at.label('updated_at'),
+                             Venue.id.label('venue_id'),
+                             Venue.name.label('venue_name'),
+                             Artist.id.label('artist_id'),
+                             Artist.name.label('artist_name')) \
+        .join(Venue, Show.venue_id == Venue.id) \
+        .join(Artist, Show.artist_id == Artist.id)
+    if start_after is not None:
+        query = query.filter(Show.start_time >= start_after)
+    if start_before is not None:
+        query = query.filter(Show.start_time < start_before)
+    if modified_since is not None:
+        query = query.filter(updated_at >= modified_since)
+    return query.order_by(Show.id).yield_per(current_app.config['EXPORT_BATCH_SIZE'])
+
+
+def show_duration(minutes):
+    # the length of a show lasting minutes, SHOW_DEFAULT_DURATION when not
+    # given, or raises ValueError
+    if minutes in (None, ''):
+        return current_app.config['SHOW_DEFAULT_DURATION']
+    duration = timedelta(minutes=int(minutes))
+    if not timedelta(0) < duration <= current_app.config['SHOW_MAX_DURATION']:
+        raise ValueError('duration must be between 1 and {} minutes'.format(
+            int(current_app.config['SHOW_MAX_DURATION'].total_seconds() // 60)))
+    return duration
+
+
+def parse_show_request(row):
+    # the (venue_id, artist_id, start_time, end_time) of a row asking for
+    # a show, with the duration in minutes, or raises ValueError
+    if not hasattr(row, 'get'):
+        raise ValueError(str(row))
+    try:
+        venue_id = int(row['venue_id'])
+        artist_id = int(row['artist_id'])
+        start_time = row['start_time']
+        if not isinstance(start_time, datetime):
+            import dateutil.parser
+            start_time = dateutil.parser.parse(str(start_time))
+        start_time = local_time(start_time)
+        duration = show_duration(row.get('duration'))
+    except KeyError as error:
+        raise ValueError('missing {}'.format(error.args[0]))
+    except (TypeError, ValueError, OverflowError) as error:
+        raise ValueError(str(error))
+    return venue_id, artist_id, start_time, start_time + duration
+
+
+def schedule_shows(rows):
+    # books the shows asked for by rows of (number, row), each with a
+    # venue_id, artist_id, start_time and optional duration, unless the
+    # venue or the artist is busy at that time with an existing show or an
+    # earlier row. Returns the (number, show) of the new shows, added to the
+    # session but not committed, and the (number, errors) of refused rows.
+    asked = []
+    refused = []
+    for number, row in rows:
+        try:
+            asked.append((number,) + parse_show_request(row))
+        except ValueError as error:
+            refused.append((number, [str(error)]))
+    booked, conflicts = check_bookings(asked)
+    shows = [(number, Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time, end_time=end_time))
+             for number, venue_id, artist_id, start_time, end_time in booked]
+    db.session.add_all([show for number, show in shows])
+    return shows, sorted(refused + conflicts)
+
+
+def check_bookings(asked):
+    # splits the (number, venue_id, artist_id, start_time, end_time) of
+    # shows asked for into those that can be booked and the (number,
+    # errors) of those whose venue or artist is unknown, or busy with an
+    # existing show or an earlier one of asked
+    if not asked:
+        return [], []
+
+    # concurrent schedules must not book the same slots, the lock lets
+    # readers through but serializes the writers of shows
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(db.text('LOCK TABLE "Show" IN SHARE ROW EXCLUSIVE MODE'))
+
+    venueIds = {row[1] for row in asked}
+    artistIds = {row[2] for row in asked}
+    knownVenues = {id for id, in db.session.query(Venue.id).filter(Venue.id.in_(venueIds))}
+    knownArtists = {id for id, in db.session.query(Artist.id).filter(Artist.id.in_(artistIds))}
+
+    maxDuration = current_app.config['SHOW_MAX_DURATION']
+    bookings = schedule.Bookings(maxDuration)
+    booked = db.session.query(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time) \
+        .filter(db.or_(Show.venue_id.in_(venueIds), Show.artist_id.in_(artistIds)),
+                Show.start_time > min(row[3] for row in asked) - maxDuration,
+                Show.start_time < max(row[4] for row in asked))
+    for show in booked:
+        label = 'show {}'.format(show.id)
+        bookings.add(('venue', show.venue_id), show.start_time, show.end_time, label)
+        bookings.add(('artist', show.artist_id), show.start_time, show.end_time, label)
+
+    accepted = []
+    refused = []
+    for number, venue_id, artist_id, start_time, end_time in asked:
+        errors = []
+        if venue_id not in knownVenues:
+            errors.append('unknown venue {}'.format(venue_id))
+        if artist_id not in knownArtists:
+            errors.append('unknown artist {}'.format(artist_id))
+        for kind, id in (('venue', venue_id), ('artist', artist_id)):
+            for label in bookings.conflicts((kind, id), start_time, end_time):
+                errors.append('{} {} is booked by {}'.format(kind, id, label))
+        if errors:
+            refused.append((number, errors))
+            continue
+        label = 'row {}'.format(number)
+        bookings.add(('venue', venue_id), start_time, end_time, label)
+        bookings.add(('artist', artist_id), start_time, end_time, label)
+        accepted.append((number, venue_id, artist_id, start_time, end_time))
+    return accepted, refused
+
+
+def invalidate_shows(shows):
+    # drops the cached pages listing any of shows
+    cache.invalidate('shows', 'genres', *{'venue:{}'.format(show.venue_id) for show in shows}
+                     | {'artist:{}'.format(show.artist_id) for show in shows})
+
+
+def genre_ids(names):
+    # the id of every genre of names, creating the ones not seen before
+    names = set(names)
+    ids = dict(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(names)))
+    missing = names - set(ids)
+    if missing:
+        db.session.execute(Genre.__table__.insert(), [{'name': name} for name in sorted(missing)])
+        ids.update(db.session.query(Genre.name, Genre.id).filter(Genre.name.in_(missing)))
+    return ids
+
+
+def set_genres(entity, names):
+    # sets the genres of a venue or artist being created or edited
+    names = [name.strip() for name in names if name.strip()]
+    ids = genre_ids(names)
+    entity.genres = Genre.query.filter(Genre.id.in_(ids.values())).all() if ids else []
+    entity.genre_names = ','.join(dict.fromkeys(names))
+
+
+def replace_genres(entity, namesById):
+    # replaces the genres of venues or artists by their id through Core,
+    # for the bulk writes that bypass the genres relationship
+    table = GENRE_TABLES[entity]
+    column = table.c.venue_id if entity is Venue else table.c.artist_id
+    ids = genre_ids({name for names in namesById.values() for name in names})
+    db.session.execute(table.delete().where(column.in_(namesById)))
+    links = [{column.key: id, 'genre_id': ids[name]}
+             for id, names in namesById.items() for name in set(names)]
+    if links:
+        db.session.execute(table.insert(), links)
+
+
+def genre_members_query(entity, genre_id, state=None):
+    # the venues or artists of a genre, only those of state if given
+    table = GENRE_TABLES[entity]
+    column = table.c.venue_id if entity is Venue else table.c.artist_id
+    query = db.session.query(entity.id, entity.name, entity.city, entity.state, entity.updated_at,
+                             entity.upcoming_shows_count.label('num_upcoming_shows')) \
+        .join(table, column == entity.id) \
+        .filter(table.c.genre_id == genre_id)
+    if state:
+        query = query.filter(entity.state == state)
+    return query.order_by(entity.name, entity.id)
+
+
+def genre_shows_query(genre_id, state=None):
+    # the upcoming shows of the artists of a genre, only those at venues of
+    # state if given. The artists come from the (genre_id, artist_id) index
+    # and their shows from the (artist_id, start_time) one.
+    query = shows_query() \
+        .join(artist_genres, artist_genres.c.artist_id == Show.artist_id) \
+        .filter(artist_genres.c.genre_id == genre_id)
+    if state:
+        query = query.filter(Venue.state == state)
+    return query
+
+
+def genres_query():
+    # every genre with its number of venues and artists
+    venueCount = db.session.query(db.func.count(venue_genres.c.venue_id)) \
+        .filter(venue_genres.c.genre_id == Genre.id).scalar_subquery()
+    artistCount = db.session.query(db.func.count(artist_genres.c.artist_id)) \
+        .filter(artist_genres.c.genre_id == Genre.id).scalar_subquery()
+    return db.session.query(Genre.id, Genre.name, venueCount.label('num_venues'), artistCount.label('num_artists')) \
+        .order_by(Genre.name)
@@ -0,0 +1,178 @@
+import itertools
+import time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+from sqlalchemy.sql.dml import UpdateBase
+import pool
+
+# Read replica routing. The DATABASE_REPLICAS of config.py become the
+# binds replica0, replica1, ... of the app, and the queries of GET and
+# HEAD requests, and of the views marked read_only, go to them in turn.
+# A replica that fails its health check, or drops a connection, is
+# skipped until it passes the next check, REPLICA_CHECK_INTERVAL seconds
+# later. Writes, and every query of a request after its first write, go
+# to the primary, as does everything outside requests.
+#
+# A user who wrote reads from the primary for READ_YOUR_WRITES_SECONDS,
+# remembered in their session cookie, so the pages after a form show what
+# they submitted whatever the lag of the replicas. Those pages bypass the
+# response cache too, which replicas may have filled.
+#
+# To try it locally, copy the SQLite database and list the copy:
+#   FYYUR_DATABASE_REPLICAS='["sqlite:////tmp/replica.db"]'
+
+READ_METHODS = ('GET', 'HEAD')
+STICKY_KEY = '_primary_until'
+
+
+class Replica(object):
+
+    def __init__(self, key):
+        self.key = key
+        self.healthy = True
+        self.checked = 0.0
+        self.reads = 0
+        self.failures = 0
+
+    def check(self, engine):
+        # a round trip to the replica, which is up when it succeeds
+        self.checked = time.monotonic()
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+        except exc.DBAPIError:
+            self.failed()
+        else:
+            self.healthy = True
+        return self.healthy
+
+    def failed(self):
+        self.healthy = False
+        self.checked = time.monotonic()
+        self.failures += 1
+
+
+class ReplicaSet(object):
+    # the replicas of one app and their turn
+
+    def __init__(self, config):
+        self.interval = config['REPLICA_CHECK_INTERVAL']
+        self.sticky = config['READ_YOUR_WRITES_SECONDS']
+        self.replicas = [Replica('replica{}'.format(number)) for number in range(len(config['DATABASE_REPLICAS']))]
+        self._turn = itertools.count()
+
+    def choose(self, engines):
+        # the next healthy replica in turn, checking those due for it, or
+        # None when all are down
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._turn) % len(self.replicas)]
+            if now - replica.checked >= self.interval:
+                replica.check(engines[replica.key])
+            if replica.healthy:
+                return replica
+        return None
+
+    def read_bind(self, engines):
+        # the replica engine for the reads of the current request, chosen
+        # on its first query, or None for the primary
+        if g.get('db_wrote') or g.get('read_your_writes'):
+            return None
+        if request.method not in READ_METHODS:
+            view = current_app.view_functions.get(request.endpoint)
+            if not getattr(view, 'read_only', False):
+                return None
+        if 'db_replica' not in g:
+            replica = self.choose(engines)
+            g.db_replica = replica
+            if replica is not None:
+                replica.reads += 1
+        return engines[g.db_replica.key] if g.db_replica is not None else None
+
+
+class Replicas(object):
+    # the replicas of the current app, whose ReplicaSet init_app() keeps in
+    # app.extensions['replicas']
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # adds the binds of the replicas, so it runs before db.init_app()
+        app.config.setdefault('DATABASE_REPLICAS', [])
+        app.config.setdefault('REPLICA_CHECK_INTERVAL', 10)
+        app.config.setdefault('READ_YOUR_WRITES_SECONDS', 10)
+        replicaSet = ReplicaSet(app.config)
+
+        binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+        for replica, uri in zip(replicaSet.replicas, app.config['DATABASE_REPLICAS']):
+            binds[replica.key] = dict(pool.engine_options(app.config, uri), url=uri)
+
+        app.extensions['replicas'] = replicaSet
+        if replicaSet.replicas:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+
+    def watch(self, app, engines):
+        # marks a replica of app down as soon as one of its connections is
+        # lost
+        for replica in app.extensions['replicas'].replicas:
+            event.listen(engines[replica.key], 'handle_error', self._on_error(replica))
+
+    def read_only(self, view):
+        # lets the replicas answer a view reached by POST, e.g. a search
+        view.read_only = True
+        return view
+
+    def metric_lines(self):
+        replicaList = current_app.extensions['replicas'].replicas
+        lines = [
+            '# HELP fyyur_db_replica_up Whether the replica passed its last health check.',
+            '# TYPE fyyur_db_replica_up gauge',
+        ]
+        lines.extend('fyyur_db_replica_up{{replica="{}"}} {}'.format(replica.key, int(replica.healthy))
+                     for replica in replicaList)
+        for name, help in (('reads', 'Requests that read from the replica.'),
+                           ('failures', 'Failed health checks and lost connections of the replica.')):
+            lines.append('# HELP fyyur_db_replica_{}_total {}'.format(name, help))
+            lines.append('# TYPE fyyur_db_replica_{}_total counter'.format(name))
+            lines.extend('fyyur_db_replica_{}_total{{replica="{}"}} {}'.format(name, replica.key,
+                                                                               getattr(replica, name))
+                         for replica in replicaList)
+        return lines
+
+    def _on_error(self, replica):
+        def on_error(context):
+            if context.is_disconnect:
+                replica.failed()
+        return on_error
+
+    def _before_request(self):
+        until = session.get(STICKY_KEY)
+        if until is not None and until <= time.time():
+            session.pop(STICKY_KEY)
+            until = None
+        g.read_your_writes = until is not None
+
+    def _after_request(self, response):
+        if g.get('db_wrote'):
+            session[STICKY_KEY] = time.time() + current_app.extensions['replicas'].sticky
+        return response
+
+
+class RoutingSession(Session):
+    # db.session, sending the reads of read-only requests to a replica
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            replicaSet = current_app.extensions.get('replicas')
+            if replicaSet is not None and replicaSet.replicas:
+                if self._flushing or isinstance(clause, UpdateBase):
+                    g.db_wrote = True
+                else:
+                    engine = replicaSet.read_bind(self._db.engines)
+                    if engine is not None:
+                        return engine
+        return super(RoutingSession, self).get_bind(mapper, clause, bind, **kwargs)
@@ -0,0 +1,30 @@
+from bisect import bisect_left, insort
+
+# Interval index of the bookings of venues and artists, used to find the
+# shows a new one would overlap. The bookings of every venue or artist
+# are kept sorted by start. Since no show lasts longer than max_duration,
+# only the bookings starting in (start - max_duration, end) can overlap
+# [start, end), and those are found with a binary search.
+
+
+class Bookings(object):
+
+    def __init__(self, max_duration):
+        self.max_duration = max_duration
+        self._intervals = {}
+
+    def add(self, key, start, end, label):
+        # books key, e.g. ('venue', 1), from start to end
+        insort(self._intervals.setdefault(key, []), (start, end, label))
+
+    def conflicts(self, key, start, end):
+        # the labels of the bookings of key overlapping [start, end)
+        intervals = self._intervals.get(key, [])
+        position = bisect_left(intervals, (start - self.max_duration,))
+        found = []
+        while position < len(intervals) and intervals[position][0] < end:
+            bookedStart, bookedEnd, label = intervals[position]
+            if bookedEnd > start:
+                found.append(label)
+            position += 1
+        return found
@@ -2,3 +2,34 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// autocomplete the venue and artist search boxes from /search/suggest
+(function() {
+  var inputs = document.querySelectorAll('form.search input[name="search_term"]');
+  Array.prototype.forEach.call(inputs, function(input, index) {
+    var type = input.form.getAttribute('action').indexOf('/artists') === 0 ? 'artist' : 'venue';
+    var list = document.createElement('datalist');
+    var pending = null;
+    list.id = 'search-suggestions-' + index;
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+    input.parentNode.appendChild(list);
+    input.addEventListener('input', function() {
+      if (pending) {
+        pending.abort();
+      }
+      pending = new XMLHttpRequest();
+      pending.open('GET', '/search/suggest?type=' + type + '&q=' + encodeURIComponent(input.value));
+      pending.onload = function() {
+        var results = JSON.parse(this.responseText).results;
+        list.innerHTML = '';
+        results.forEach(function(result) {
+          var option = document.createElement('option');
+          option.value = result.name;
+          list.appendChild(option);
+        });
+      };
+      pending.send();
+    });
+  });
+})();
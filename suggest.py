@@ -0,0 +1,90 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+# In-process prefix index of venue and artist names for the search box
+# autocomplete. Every word of a name starts a key, so "hall" finds
+# "The Musical Hall". The keys are kept in one sorted list, so a lookup is
+# a binary search followed by a short scan, without touching the database.
+#
+# Each worker process holds its own index, which only sees the writes
+# that went through that worker until it is rebuilt.
+
+
+def _keys(name):
+    name = (name or '').lower()
+    return {name[match.start():] for match in re.finditer(r'\w+', name)}
+
+
+class PrefixIndex(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._names = {}
+        self.built = False
+        self.built_at = None
+
+    def build(self, rows):
+        # replaces the whole index with rows of (kind, id, name)
+        entries = []
+        names = {}
+        for kind, id, name in rows:
+            names[(kind, id)] = name
+            entries.extend((key, kind, id) for key in _keys(name))
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._names = names
+            self.built = True
+            self.built_at = time.time()
+
+    def age(self):
+        # seconds since the index was last built
+        return time.time() - self.built_at if self.built else None
+
+    def add(self, kind, id, name):
+        # adds or renames a single venue or artist
+        with self._lock:
+            if not self.built:
+                return
+            self._discard(kind, id)
+            self._names[(kind, id)] = name
+            for key in _keys(name):
+                insort(self._entries, (key, kind, id))
+
+    def remove(self, kind, id):
+        with self._lock:
+            if self.built:
+                self._discard(kind, id)
+
+    def _discard(self, kind, id):
+        name = self._names.pop((kind, id), None)
+        if name is None:
+            return
+        for key in _keys(name):
+            position = bisect_left(self._entries, (key, kind, id))
+            if position < len(self._entries) and self._entries[position] == (key, kind, id):
+                del self._entries[position]
+
+    def lookup(self, prefix, kind=None, limit=10):
+        # the (kind, id, name) of up to limit names with a word starting
+        # with prefix, in alphabetical order of the matching key, only of
+        # the given kind if there is one
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            position = bisect_left(self._entries, (prefix,))
+            while position < len(self._entries) and len(results) < limit:
+                key, entry_kind, id = self._entries[position]
+                if not key.startswith(prefix):
+                    break
+                if (entry_kind, id) not in seen and kind in (None, entry_kind):
+                    seen.add((entry_kind, id))
+                    results.append((entry_kind, id, self._names[(entry_kind, id)]))
+                position += 1
+        return results
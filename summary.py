@@ -0,0 +1,60 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, and_, event, func, select
+
+# Precomputed rows of the /venues page: every venue with its area and its
+# number of upcoming shows, counted from the shows when its row was last
+# refreshed, so that the page is a single read of an index in the order
+# it is listed.
+#
+# A table on every database rather than a postgres materialized view,
+# which can only be recomputed whole: a write to a venue or its shows
+# refreshes the rows of just those venues, in its own transaction.
+# `flask rollover-counters` refreshes the venues of the shows that started
+# since its last run, and `flask refresh-venue-areas` every row, both from
+# cron. Readers keep seeing the previous rows until a refresh commits.
+
+# kept out of db.metadata, it is created after the shows, see install()
+VENUE_AREAS = Table(
+    'VenueAreaSummary', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('name', String),
+    Column('city', String(120)),
+    Column('state', String(120)),
+    Column('updated_at', DateTime),
+    Column('num_upcoming_shows', Integer),
+    Index('ix_VenueAreaSummary_state_city', 'state', 'city', 'name', 'id'),
+)
+
+
+def venue_areas_select(venues, shows, now):
+    # the rows of the summary, counting the shows starting after now
+    upcoming = and_(shows.c.venue_id == venues.c.id, shows.c.start_time > now)
+    return select(venues.c.id, venues.c.name, venues.c.city, venues.c.state, venues.c.updated_at,
+                  func.count(shows.c.id).label('num_upcoming_shows')) \
+        .select_from(venues.outerjoin(shows, upcoming)) \
+        .group_by(venues.c.id)
+
+
+def install(venues, shows):
+    # creates the summary along with the shows table, which comes after
+    # the venues, and drops it before
+    def create(target, connection, **kw):
+        VENUE_AREAS.create(connection)
+
+    def drop(target, connection, **kw):
+        VENUE_AREAS.drop(connection, checkfirst=True)
+
+    event.listen(shows, 'after_create', create)
+    event.listen(shows, 'before_drop', drop)
+
+
+def refresh(session, venues, shows, ids=None):
+    # recomputes the rows of the venues ids, or every row, within the
+    # transaction of session
+    delete = VENUE_AREAS.delete()
+    rows = venue_areas_select(venues, shows, datetime.now())
+    if ids is not None:
+        delete = delete.where(VENUE_AREAS.c.id.in_(ids))
+        rows = rows.where(venues.c.id.in_(ids))
+    session.execute(delete)
+    session.execute(VENUE_AREAS.insert().from_select([column.name for column in VENUE_AREAS.c], rows))
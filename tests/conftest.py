@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+import pytest
+from app import create_app
+from extensions import db
+from models import Artist, Show, Venue
+
+# Every test gets an app of its own from create_app(), on a fresh SQLite
+# database holding a few venues, artists and shows.
+
+
+@pytest.fixture
+def config(tmp_path):
+    # the settings given to create_app(), tests may change them first
+    return {
+        'TESTING': True,
+        'SECRET_KEY': 'test',
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///{}'.format(tmp_path / 'fyyur.db'),
+        'WTF_CSRF_ENABLED': False,
+        'ITEMS_PER_PAGE': 2,
+        'PAST_SHOWS_PER_PAGE': 2,
+    }
+
+
+@pytest.fixture
+def app(config):
+    app = create_app(config)
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def data(app):
+    # three venues and three artists, the first venue with a past and an
+    # upcoming show. Returns the start times of the shows.
+    now = datetime.now().replace(microsecond=0)
+    times = {'past': now - timedelta(days=2), 'upcoming': now + timedelta(days=2)}
+    with app.app_context():
+        for number in range(1, 4):
+            db.session.add(Venue(name='Venue {}'.format(number), city='San Francisco', state='CA',
+                                 address='{} Main St'.format(number), phone='555-000{}'.format(number),
+                                 facebook_link='https://www.facebook.com/venue{}'.format(number)))
+            db.session.add(Artist(name='Artist {}'.format(number), city='San Francisco', state='CA',
+                                  phone='555-100{}'.format(number),
+                                  facebook_link='https://www.facebook.com/artist{}'.format(number)))
+        db.session.commit()
+        db.session.add(Show(venue_id=1, artist_id=1, start_time=times['past']))
+        db.session.add(Show(venue_id=1, artist_id=2, start_time=times['upcoming']))
+        db.session.commit()
+        from queries import refresh_venue_areas
+        refresh_venue_areas()
+    return times
@@ -0,0 +1,72 @@
+import logging
+import pytest
+from app import create_app
+from views.main import bp
+
+
+def test_config_mapping_overrides_config_py(app):
+    assert app.config['ITEMS_PER_PAGE'] == 2
+    assert app.testing
+
+
+def test_blueprints_are_registered(app):
+    assert {'main', 'venues', 'artists', 'shows', 'api'} <= set(app.blueprints)
+    assert app.blueprints['main'] is bp
+
+
+def test_secret_key_is_required_outside_debug(config):
+    config['SECRET_KEY'] = None
+    with pytest.raises(RuntimeError):
+        create_app(config)
+
+
+def test_pages_render(client, data):
+    for path in ('/', '/venues', '/artists', '/shows', '/genres', '/venues/1', '/artists/1',
+                 '/venues/create', '/artists/create', '/shows/create', '/venues/1/edit', '/artists/1/edit'):
+        assert client.get(path).status_code == 200, path
+
+
+def test_unknown_pages_are_404(client, data):
+    assert client.get('/venues/99').status_code == 404
+    assert client.get('/api/v1/artists/99').get_json()['error']['status'] == 404
+    for path in ('/venues/99/edit', '/artists/99/edit'):
+        assert client.get(path).status_code == 404, path
+        assert client.post(path, data={'name': 'Nobody', 'state': 'CA'}).status_code == 404, path
+
+
+def test_apps_keep_their_own_state(config, app, client, data, tmp_path):
+    config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///{}'.format(tmp_path / 'other.db')
+    config['METRICS_TOKEN'] = 'other'
+    other = create_app(config)
+    client.get('/venues')
+    metrics = other.test_client().get('/_metrics', headers={'Authorization': 'Bearer other'})
+    assert ('venues.venues', 200) in app.extensions['instrumentation'].totals
+    assert 'venues.venues' not in metrics.get_data(as_text=True)
+    assert app.extensions['suggestions'] is not other.extensions['suggestions']
+    assert app.extensions['replicas'] is not other.extensions['replicas']
+
+
+def test_error_log_is_set_by_config(config, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config['TESTING'] = False
+    config['ERROR_LOG'] = str(tmp_path / 'fyyur.log')
+    app = create_app(config)
+    assert (tmp_path / 'fyyur.log').exists()
+    config['ERROR_LOG'] = None
+    create_app(config)
+    assert not (tmp_path / 'error.log').exists()
+    # the logger is shared by the apps of the process
+    for handler in app.logger.handlers[:]:
+        if isinstance(handler, logging.FileHandler):
+            app.logger.removeHandler(handler)
+            handler.close()
+
+
+def test_commands_run_without_statement_timeout(config, monkeypatch):
+    import pool
+    uri = 'postgresql+psycopg://localhost/fyyur'
+    app = create_app(config)
+    assert pool.engine_options(app.config, uri)['connect_args'] == {'options': '-c statement_timeout=10000'}
+    monkeypatch.setenv('FLASK_RUN_FROM_CLI', 'true')
+    app = create_app(config)
+    assert 'connect_args' not in pool.engine_options(app.config, uri)
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from aio import AsgiApp
+from extensions import async_db
+
+
+@pytest.fixture
+def config(config):
+    config['CACHE_TYPE'] = None
+    return config
+
+
+@pytest.fixture
+def asgi(app):
+    async_db.init_app(app)
+    yield AsgiApp(app, async_db)
+    asyncio.run(async_db.dispose(app))
+
+
+def call(asgi, path, method='GET', headers=(), body=b'', drop_after=None):
+    # runs one request through the adapter, returning the status, the
+    # headers and the body it sent. The client disconnects after
+    # drop_after chunks of the body, if given.
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'root_path': '',
+             'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]}
+    sent = []
+
+    async def run():
+        requested = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            # the body, then nothing until the client goes away, like a
+            # server
+            if not requested:
+                requested.append(True)
+                return {'type': 'http.request', 'body': body}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if drop_after is not None and len(sent) > drop_after:
+                disconnected.set()
+
+        await asgi(scope, receive, send)
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+    start = sent[0]
+    return (start['status'], {name.decode('latin-1'): value.decode('latin-1') for name, value in start['headers']},
+            b''.join(message.get('body', b'') for message in sent[1:]))
+
+
+def test_async_view_renders_the_venue(asgi, data):
+    status, headers, body = call(asgi, '/venues/1')
+    assert status == 200
+    assert b'Venue 1' in body and b'Artist 2' in body
+    assert 'etag' in headers
+
+
+def test_async_view_answers_conditional_requests(asgi, data):
+    etag = call(asgi, '/venues/1')[1]['etag']
+    status, headers, body = call(asgi, '/venues/1', headers=[('If-None-Match', etag)])
+    assert status == 304 and body == b''
+
+
+def test_async_view_unknown_venue_is_404(asgi, data):
+    assert call(asgi, '/venues/99')[0] == 404
+
+
+def test_other_views_run_as_wsgi(asgi, data):
+    status, headers, body = call(asgi, '/shows')
+    assert status == 200 and b'Artist 2' in body
+    assert call(asgi, '/nowhere')[0] == 404
+
+
+def test_a_dropped_client_stops_the_streamed_response(app, asgi):
+    chunks = []
+
+    def stream():
+        def generate():
+            try:
+                for number in range(1000):
+                    chunks.append(number)
+                    yield '{}\n'.format(number)
+            finally:
+                chunks.append('closed')
+        return app.response_class(generate(), mimetype='text/plain')
+
+    app.add_url_rule('/stream', 'stream', stream)
+    status, headers, body = call(asgi, '/stream', drop_after=2)
+    assert status == 200
+    assert chunks[-1] == 'closed' and len(chunks) < 100
+
+
+def test_lifespan(asgi):
+    messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+    sent = []
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi({'type': 'lifespan'}, receive, send))
+    assert [message['type'] for message in sent] == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
@@ -0,0 +1,25 @@
+import json
+from flask import Flask
+from assets import Assets
+
+
+def test_stylesheets_point_at_the_hashed_files(tmp_path):
+    static = tmp_path / 'static'
+    # the top folder, and its stylesheet, are walked before fonts/ and img/
+    for path, content in (('main.css', "@font-face { src: url('fonts/a.woff') }\n"
+                                       "body { background: url(img/b.png) }\n"),
+                          ('fonts/a.woff', 'font'), ('img/b.png', 'image')):
+        (static / path).parent.mkdir(parents=True, exist_ok=True)
+        (static / path).write_text(content)
+    app = Flask(__name__, static_folder=str(static))
+    assets = Assets(app)
+    with app.app_context():
+        manifest = assets.build()
+    css = (static / 'dist' / manifest['main.css']).read_text()
+    assert "url('{}')".format(manifest['fonts/a.woff']) in css
+    assert 'url({})'.format(manifest['img/b.png']) in css
+    assert json.loads((static / 'dist' / 'manifest.json').read_text()) == manifest
+
+    # a second build, over the first one, gives the same names
+    with app.app_context():
+        assert assets.build() == manifest
@@ -0,0 +1,146 @@
+import fnmatch
+import threading
+import pytest
+from cache import MemoryBackend, RedisBackend
+from extensions import cache
+
+
+class FakeRedis(object):
+    # the part of the redis-py client RedisBackend uses, values come back
+    # as bytes like from a server
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(member.encode() for member in members)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, ()))
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            key = key.decode() if isinstance(key, bytes) else key
+            self.values.pop(key, None)
+            self.sets.pop(key, None)
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.values) + list(self.sets) if fnmatch.fnmatch(key, pattern)]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        for name, args, kwargs in self.calls:
+            getattr(self.client, name)(*args, **kwargs)
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request, app):
+    state = app.extensions['cache']
+    if request.param == 'redis':
+        state.backend = state.fragments = RedisBackend(FakeRedis())
+    return state.backend
+
+
+def stats(app):
+    with app.app_context():
+        return cache.stats()
+
+
+def test_pages_are_served_from_cache_until_invalidated(app, client, data, backend):
+    assert client.get('/venues/1').status_code == 200
+    assert client.get('/venues/1').status_code == 200
+    assert stats(app)['endpoints']['venues.show_venue'] == {'hits': 1, 'misses': 1}
+
+    # an edit of an artist listed on the page invalidates it
+    form = {'name': 'Renamed', 'city': 'San Francisco', 'state': 'CA', 'phone': '555-1001',
+            'facebook_link': 'https://www.facebook.com/artist1', 'genres': 'Jazz'}
+    client.post('/artists/1/edit', data=form)
+    with client.session_transaction() as session:
+        session.pop('_flashes', None)
+    assert 'Renamed' in client.get('/venues/1').get_data(as_text=True)
+    assert stats(app)['endpoints']['venues.show_venue'] == {'hits': 1, 'misses': 2}
+
+
+def test_cache_hits_keep_their_validators(app, client, data, backend):
+    etag = client.get('/venues/1').headers['ETag']
+    response = client.get('/venues/1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert stats(app)['hits'] == 1
+
+
+def test_fragments_are_cached(app, client, data, backend):
+    client.get('/shows')
+    misses = stats(app)['fragments']['misses']
+    assert misses > 0
+    with app.app_context():
+        cache.invalidate('shows')
+    client.get('/shows')
+    assert stats(app)['fragments'] == {'hits': misses, 'misses': misses}
+
+
+def test_redis_backend_invalidates_by_tag():
+    backend = RedisBackend(FakeRedis())
+    backend.set('a', b'1', 60, {'venue:1', 'venues'})
+    backend.set('b', b'2', 60, {'venue:2', 'venues'})
+    backend.invalidate(['venue:1'])
+    assert backend.get('a') is None and backend.get('b') == b'2'
+    backend.invalidate(['venues'])
+    assert backend.get('b') is None
+    backend.set('c', b'3', 60, ())
+    backend.clear()
+    assert backend.client.values == {} and backend.client.sets == {}
+
+
+def test_memory_backend_evicts_and_expires():
+    backend = MemoryBackend(max_entries=2)
+    for key in 'abc':
+        backend.set(key, key, 60, {'tag'})
+    assert backend.get('a') is None and backend.get('c') == 'c'
+    backend.set('d', 'd', -1, ())
+    assert backend.get('d') is None
+    backend.invalidate(['tag'])
+    assert backend.get('b') is None and backend.get('c') is None
+
+
+def test_counters_add_up_across_threads(app, client, data):
+    def fetch():
+        for _ in range(25):
+            client.get('/venues/1')
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counters = stats(app)
+    assert counters['hits'] + counters['misses'] == 100
+
+
+def test_apps_keep_their_own_cache(config, app):
+    from app import create_app
+    config['CACHE_TYPE'] = None
+    other = create_app(config)
+    assert other.extensions['cache'].backend is None and other.extensions['cache'].fragments is None
+    assert isinstance(app.extensions['cache'].backend, MemoryBackend)
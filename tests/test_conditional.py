@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+ARTIST_FORM = {'name': 'Artist 1', 'city': 'San Francisco', 'state': 'CA', 'phone': '555-1001',
+               'facebook_link': 'https://www.facebook.com/artist1', 'genres': 'Jazz'}
+
+
+def revalidate(client, path, etag):
+    return client.get(path, headers={'If-None-Match': etag})
+
+
+def drop_flashes(client):
+    with client.session_transaction() as session:
+        session.pop('_flashes', None)
+
+
+def test_unchanged_pages_are_not_modified(client, data):
+    for path in ('/venues/1', '/artists/1', '/api/v1/venues/1'):
+        response = client.get(path)
+        assert response.headers['Last-Modified']
+        assert revalidate(client, path, response.headers['ETag']).status_code == 304
+
+
+def test_each_page_of_past_shows_has_its_own_etag(client, data):
+    assert client.get('/venues/1').headers['ETag'] != client.get('/venues/1?page=2').headers['ETag']
+
+
+def test_renaming_a_listed_artist_changes_the_venue_page(client, data):
+    etag = client.get('/venues/1').headers['ETag']
+    client.post('/artists/1/edit', data=dict(ARTIST_FORM, name='Renamed Artist'))
+    drop_flashes(client)
+    response = revalidate(client, '/venues/1', etag)
+    assert response.status_code == 200
+    assert 'Renamed Artist' in response.get_data(as_text=True)
+
+
+def test_renaming_a_venue_changes_the_pages_of_its_artists(client, data):
+    etag = client.get('/artists/2').headers['ETag']
+    form = {'name': 'Renamed Venue', 'city': 'San Francisco', 'state': 'CA', 'address': '1 Main St',
+            'phone': '555-0001', 'facebook_link': 'https://www.facebook.com/venue1', 'genres': 'Jazz'}
+    client.post('/venues/1/edit', data=form)
+    drop_flashes(client)
+    response = revalidate(client, '/artists/2', etag)
+    assert response.status_code == 200
+    assert 'Renamed Venue' in response.get_data(as_text=True)
+
+
+def test_a_new_show_changes_the_page(client, data):
+    etag = client.get('/artists/3').headers['ETag']
+    start = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    client.post('/shows/create', data={'venue_id': 2, 'artist_id': 3, 'start_time': start})
+    drop_flashes(client)
+    response = revalidate(client, '/artists/3', etag)
+    assert response.status_code == 200
+    assert 'Venue 2' in response.get_data(as_text=True)
+
+
+def test_pages_with_flashed_messages_have_no_validators(client, data):
+    client.post('/artists/1/edit', data=ARTIST_FORM)
+    response = client.get('/artists/1', follow_redirects=True)
+    assert 'ETag' not in response.headers
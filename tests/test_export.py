@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from extensions import db
+from models import Artist
+
+
+def export(client, format='jsonl', **filters):
+    response = client.get('/export/shows.' + format, query_string=filters)
+    assert response.status_code == 200
+    if format == 'csv':
+        return list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_every_show_is_exported(client, data):
+    rows = export(client)
+    assert [row['id'] for row in rows] == [1, 2]
+    assert rows[0]['venue_name'] == 'Venue 1' and rows[0]['artist_name'] == 'Artist 1'
+    assert [row['id'] for row in export(client, 'csv')] == ['1', '2']
+
+
+def test_start_filters(client, data):
+    assert [row['id'] for row in export(client, start_after=datetime.now().isoformat())] == [2]
+    assert [row['id'] for row in export(client, start_before=datetime.now().isoformat())] == [1]
+
+
+def test_modified_since_includes_shows_of_edited_artists(app, client, data):
+    since = datetime.now() + timedelta(seconds=1)
+    assert export(client, modified_since=since.isoformat()) == []
+    with app.app_context():
+        artist = db.session.get(Artist, 2)
+        artist.name = 'Renamed'
+        artist.updated_at = since + timedelta(seconds=1)
+        db.session.commit()
+    rows = export(client, modified_since=since.isoformat())
+    assert [(row['id'], row['artist_name']) for row in rows] == [(2, 'Renamed')]
+    assert rows[0]['updated_at'] == (since + timedelta(seconds=1)).isoformat()
+
+
+def test_bad_filters_are_rejected(client, data):
+    assert client.get('/export/shows.csv?modified_since=yesterday-ish').status_code == 400
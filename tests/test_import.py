@@ -0,0 +1,140 @@
+import json
+from datetime import timedelta
+import importer
+from extensions import db
+from models import Show, Venue
+
+VENUE_HEADER = 'name,city,state,address,phone,facebook_link,genres\n'
+
+
+def run_import(app, tmp_path, kind, lines, name='rows.csv', *options):
+    source = tmp_path / name
+    source.write_text(''.join(lines))
+    return app.test_cli_runner().invoke(args=['import', kind, str(source)] + list(options))
+
+
+def venue_line(name, address, phone, link):
+    return '{},San Francisco,CA,{},{},https://www.facebook.com/{},Jazz\n'.format(name, address, phone, link)
+
+
+def test_venues_are_inserted_and_updated(app, tmp_path, data):
+    result = run_import(app, tmp_path, 'venues', [
+        VENUE_HEADER,
+        venue_line('New Hall', '10 Main St', '555-0010', 'newhall'),
+        venue_line('Venue One Renamed', '1 Main St', '555-0001', 'venue1'),
+        'Nameless,San Francisco,CA,11 Main St,555-0011,not a link,Jazz\n',
+    ])
+    assert '3 rows' in result.output
+    assert '1 inserted, 1 updated, 1 rejected' in result.output
+    assert 'line 4' in result.output
+    with app.app_context():
+        assert db.session.get(Venue, 1).name == 'Venue One Renamed'
+        assert Venue.query.filter_by(name='New Hall').count() == 1
+
+
+def test_rows_sharing_a_unique_value_are_rejected(app, tmp_path, data):
+    result = run_import(app, tmp_path, 'venues', [
+        VENUE_HEADER,
+        venue_line('First', '20 Main St', '555-0020', 'first'),
+        venue_line('Same phone', '21 Main St', '555-0020', 'samephone'),
+        venue_line('Venue One', '1 Main St', '555-0001', 'venue1'),
+        # another row updating venue 1, through its facebook link
+        venue_line('Venue One Again', '22 Main St', '555-0022', 'venue1'),
+    ])
+    assert '1 inserted, 1 updated, 2 rejected' in result.output
+    assert 'line 3: duplicate phone 555-0020 of an earlier row' in result.output
+    assert 'line 5: duplicate' in result.output
+    with app.app_context():
+        assert Venue.query.filter_by(phone='555-0020').one().name == 'First'
+        assert db.session.get(Venue, 1).name == 'Venue One'
+
+
+def test_duplicates_are_found_across_batches(app, tmp_path, data):
+    result = run_import(app, tmp_path, 'venues', [
+        VENUE_HEADER,
+        venue_line('First', '20 Main St', '555-0020', 'first'),
+        venue_line('Second', '21 Main St', '555-0021', 'first'),
+    ], 'rows.csv', '--batch-size', '1')
+    assert '1 inserted, 0 updated, 1 rejected' in result.output
+    assert 'line 3: duplicate facebook_link https://www.facebook.com/first' in result.output
+
+
+def show_line(venue_id, artist_id, start):
+    return json.dumps({'venue_id': venue_id, 'artist_id': artist_id,
+                       'start_time': start.strftime('%Y-%m-%d %H:%M:%S')}) + '\n'
+
+
+def test_shows_are_booked_without_overlaps(app, tmp_path, data):
+    later = data['upcoming'] + timedelta(days=7)
+    lines = [
+        # overlaps the upcoming show of venue 1
+        show_line(1, 3, data['upcoming'] + timedelta(minutes=30)),
+        show_line(2, 3, later),
+        # artist 3 is already booked by the line before
+        show_line(3, 3, later + timedelta(hours=1)),
+        show_line(99, 3, later + timedelta(days=1)),
+        show_line(3, 1, later),
+    ]
+    for options in ((), ('--batch-size', '1')):
+        with app.app_context():
+            Show.query.filter(Show.start_time >= later).delete()
+            db.session.commit()
+        result = run_import(app, tmp_path, 'shows', lines, 'shows.jsonl', *options)
+        assert '5 rows' in result.output
+        assert '2 inserted, 0 updated, 3 rejected' in result.output
+        assert 'line 1: venue 1 is booked by show 2' in result.output
+        assert 'line 3: artist 3 is booked by ' in result.output
+        assert 'line 4: unknown venue 99' in result.output
+    with app.app_context():
+        assert Show.query.count() == 4
+
+
+def test_shows_keep_their_duration(app, tmp_path, data):
+    later = data['upcoming'] + timedelta(days=7)
+    lines = [
+        json.dumps({'venue_id': 2, 'artist_id': 3, 'duration': 600,
+                    'start_time': later.strftime('%Y-%m-%d %H:%M:%S')}) + '\n',
+        # within the ten hours of the show before
+        show_line(2, 1, later + timedelta(hours=5)),
+        json.dumps({'venue_id': 3, 'artist_id': 1, 'duration': 100000,
+                    'start_time': later.strftime('%Y-%m-%d %H:%M:%S')}) + '\n',
+    ]
+    result = run_import(app, tmp_path, 'shows', lines, 'shows.jsonl')
+    assert '1 inserted, 0 updated, 2 rejected' in result.output
+    assert 'line 2: venue 2 is booked by ' in result.output
+    assert 'line 3: duration must be between' in result.output
+    with app.app_context():
+        show = Show.query.filter_by(venue_id=2).one()
+        assert show.end_time - show.start_time == timedelta(hours=10)
+
+
+class FakeCopy(object):
+    # the psycopg 3 cursor and copy objects copy_rows uses
+
+    def __init__(self):
+        self.statements = []
+        self.rows = []
+
+    def cursor(self):
+        return self
+
+    def copy(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def test_copy_rows_writes_every_row():
+    connection = FakeCopy()
+    rows = [{'venue_id': 1, 'artist_id': 2, 'start_time': None}, {'venue_id': 3, 'artist_id': 4, 'start_time': None}]
+    importer.copy_rows(connection, Show.__table__, rows)
+    assert connection.statements == ['COPY "Show" ("venue_id", "artist_id", "start_time") FROM STDIN']
+    assert connection.rows == [[1, 2, None], [3, 4, None]]
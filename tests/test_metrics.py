@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from extensions import db
+
+TOKEN = {'Authorization': 'Bearer secret'}
+
+
+@pytest.fixture
+def config(config):
+    config['METRICS_TOKEN'] = 'secret'
+    return config
+
+
+def test_requests_report_their_queries(client, data):
+    timing = client.get('/venues/1').headers['Server-Timing']
+    assert 'queries' in timing and 'db;dur=' in timing and 'pool;dur=' in timing
+
+
+def test_metrics_aggregate_the_requests(client, data):
+    client.get('/venues/1')
+    body = client.get('/_metrics', headers=TOKEN).get_data(as_text=True)
+    assert 'fyyur_requests_total{endpoint="venues.show_venue",status="200"} 1' in body
+    assert 'fyyur_cache_misses_total{endpoint="venues.show_venue"} 1' in body
+    assert 'fyyur_db_pool_checkouts_total' in body
+
+
+def test_internal_endpoints_need_the_token(client):
+    for path in ('/_metrics', '/_cache'):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+        assert client.get(path, headers=TOKEN).status_code == 200
+
+
+def test_internal_endpoints_are_off_without_a_token(app, client):
+    app.config['METRICS_TOKEN'] = None
+    assert client.get('/_metrics').status_code == 404
+    assert client.get('/_cache', headers=TOKEN).status_code == 404
+
+
+def test_failed_queries_leave_no_timing_behind(app):
+    with app.app_context(), db.engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.exec_driver_sql('SELECT * FROM missing')
+        connection.exec_driver_sql('SELECT 1')
+        assert 'query_started' not in connection.info
@@ -0,0 +1,101 @@
+import importlib.util
+import os
+import time
+from datetime import datetime, timedelta
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+# The data migrations run against a bare SQLite schema holding only the
+# tables and columns they touch.
+
+VERSIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations', 'versions')
+
+
+def load(revision):
+    spec = importlib.util.spec_from_file_location(revision, os.path.join(VERSIONS, revision + '_.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def connection(tmp_path):
+    engine = sa.create_engine('sqlite:///{}'.format(tmp_path / 'migrations.db'))
+    with engine.begin() as connection:
+        yield connection
+    engine.dispose()
+
+
+def migrate(connection, revision, step='upgrade'):
+    with Operations.context(MigrationContext.configure(connection)):
+        getattr(load(revision), step)()
+
+
+def test_search_migration_builds_the_sqlite_index(connection):
+    for table in ('Venue', 'Artist'):
+        connection.exec_driver_sql('CREATE TABLE "{}" (id INTEGER PRIMARY KEY, name VARCHAR, city VARCHAR, '
+                                   'state VARCHAR, genres TEXT)'.format(table))
+    connection.exec_driver_sql('''INSERT INTO "Venue" VALUES (1, 'The Musical Hop', 'San Francisco', 'CA', 'Jazz')''')
+    migrate(connection, 'a41d9e3b7c05')
+
+    def search(fts, query):
+        return [id for id, in connection.exec_driver_sql(
+            'SELECT rowid FROM {0} WHERE {0} MATCH ? ORDER BY rowid'.format(fts), (query,))]
+
+    assert search('venue_search', 'music*') == [1]
+    connection.exec_driver_sql('''INSERT INTO "Venue" VALUES (2, 'Park Square', 'San Francisco', 'CA', 'Jazz')''')
+    connection.exec_driver_sql('''UPDATE "Venue" SET genres = 'Folk' WHERE id = 1''')
+    assert search('venue_search', 'jazz') == [2]
+    connection.exec_driver_sql('''INSERT INTO "Artist" VALUES (1, 'Guns N Petals', 'San Francisco', 'CA', 'Rock')''')
+    assert search('artist_search', 'petal*') == [1]
+
+    migrate(connection, 'a41d9e3b7c05', 'downgrade')
+    tables = {name for name, in connection.exec_driver_sql("SELECT name FROM sqlite_master")}
+    assert not tables & {'venue_search', 'artist_search', 'venue_search_ai', 'artist_search_au'}
+
+
+def test_counter_migration_counts_shows_after_local_now(connection):
+    connection.exec_driver_sql('CREATE TABLE "Venue" (id INTEGER PRIMARY KEY)')
+    connection.exec_driver_sql('CREATE TABLE "Artist" (id INTEGER PRIMARY KEY)')
+    connection.exec_driver_sql('CREATE TABLE "Show" (id INTEGER PRIMARY KEY, venue_id INTEGER, artist_id INTEGER, '
+                               'start_time DATETIME)')
+    connection.exec_driver_sql('INSERT INTO "Venue" VALUES (1)')
+    connection.exec_driver_sql('INSERT INTO "Artist" VALUES (1)')
+    # shows a minute either side of now, in local time like the app writes
+    # them, whatever the offset of the local time zone
+    now = datetime.now()
+    shows = sa.table('Show', sa.column('venue_id'), sa.column('artist_id'), sa.column('start_time', sa.DateTime))
+    connection.execute(shows.insert(), [{'venue_id': 1, 'artist_id': 1, 'start_time': now - timedelta(minutes=1)},
+                                        {'venue_id': 1, 'artist_id': 1, 'start_time': now + timedelta(minutes=1)}])
+    migrate(connection, '5c7e0b2f9d18')
+    assert connection.exec_driver_sql('SELECT upcoming_shows_count FROM "Venue"').scalar() == 1
+    assert connection.exec_driver_sql('SELECT upcoming_shows_count FROM "Artist"').scalar() == 1
+
+
+def test_counter_migration_ignores_the_utc_clock(connection, monkeypatch):
+    # with the local time zone far ahead of UTC, CURRENT_TIMESTAMP would
+    # count the past show as upcoming
+    monkeypatch.setenv('TZ', 'Pacific/Kiritimati')
+    time.tzset()
+    try:
+        test_counter_migration_counts_shows_after_local_now(connection)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_summary_migration_counts_upcoming_shows(connection):
+    connection.exec_driver_sql('CREATE TABLE "Venue" (id INTEGER PRIMARY KEY, name VARCHAR, city VARCHAR, '
+                               'state VARCHAR, updated_at DATETIME)')
+    connection.exec_driver_sql('CREATE TABLE "Show" (id INTEGER PRIMARY KEY, venue_id INTEGER, start_time DATETIME)')
+    connection.exec_driver_sql('''INSERT INTO "Venue" VALUES (1, 'The Musical Hop', 'San Francisco', 'CA', NULL)''')
+    now = datetime.now()
+    shows = sa.table('Show', sa.column('venue_id'), sa.column('start_time', sa.DateTime))
+    connection.execute(shows.insert(), [{'venue_id': 1, 'start_time': now - timedelta(minutes=1)},
+                                        {'venue_id': 1, 'start_time': now + timedelta(minutes=1)}])
+    migrate(connection, '7f3a1c9e5b24')
+    assert connection.exec_driver_sql('SELECT num_upcoming_shows FROM "VenueAreaSummary"').scalar() == 1
+    migrate(connection, '7f3a1c9e5b24', 'downgrade')
+    assert connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE name = 'VenueAreaSummary'").scalar() is None
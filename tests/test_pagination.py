@@ -0,0 +1,49 @@
+import pytest
+from queries import encode_cursor
+
+
+def names(response):
+    return [row['name'] for row in response.get_json()['data']]
+
+
+def test_cursors_round_trip(client, data):
+    first = client.get('/api/v1/artists')
+    assert names(first) == ['Artist 1', 'Artist 2']
+    assert first.get_json()['links']['prev'] is None
+
+    second = client.get(first.get_json()['links']['next'])
+    assert names(second) == ['Artist 3']
+    assert second.get_json()['links']['next'] is None
+
+    back = client.get(second.get_json()['links']['prev'])
+    assert names(back) == ['Artist 1', 'Artist 2']
+
+
+def test_html_listing_links_to_the_next_page(client, data):
+    page = client.get('/artists').get_data(as_text=True)
+    assert 'Artist 2' in page and 'Artist 3' not in page
+    cursor = encode_cursor(['Artist 2', 2])
+    assert 'after=' + cursor in page
+    assert 'Artist 3' in client.get('/artists?after=' + cursor).get_data(as_text=True)
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    encode_cursor(['x']),
+    encode_cursor(['x', 1]),
+    encode_cursor([1, 'Artist 1']),
+    encode_cursor({'name': 'x'}),
+])
+def test_tampered_cursors_are_rejected(client, data, cursor):
+    assert client.get('/shows', query_string={'after': cursor}).status_code == 400
+    assert client.get('/shows', query_string={'before': cursor}).status_code == 400
+
+    response = client.get('/api/v1/shows', query_string={'after': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['error']['message'] == 'invalid cursor'
+
+
+def test_cursor_values_must_match_the_key_types(client, data):
+    assert client.get('/artists', query_string={'after': encode_cursor(['Artist 1', 1])}).status_code == 200
+    assert client.get('/artists', query_string={'after': encode_cursor([1, 'Artist 1'])}).status_code == 400
+    assert client.get('/artists', query_string={'after': encode_cursor(['Artist 1', True])}).status_code == 400
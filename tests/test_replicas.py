@@ -0,0 +1,65 @@
+import os
+import shutil
+import pytest
+from extensions import db
+
+FORM = {'name': 'The Replica Room', 'city': 'San Francisco', 'state': 'CA', 'address': '9 Main St',
+        'phone': '555-0009', 'facebook_link': 'https://www.facebook.com/replicaroom', 'genres': 'Jazz'}
+
+
+@pytest.fixture
+def config(config, tmp_path):
+    config['DATABASE_REPLICAS'] = ['sqlite:///{}'.format(tmp_path / 'replica.db')]
+    config['CACHE_TYPE'] = None
+    return config
+
+
+@pytest.fixture
+def replica(app, data, tmp_path):
+    # the replica starts as a copy of the seeded primary
+    shutil.copy(str(tmp_path / 'fyyur.db'), str(tmp_path / 'replica.db'))
+    return app.extensions['replicas'].replicas[0]
+
+
+def test_reads_go_to_the_replica(app, client, replica):
+    # a rename written to the primary only, behind the replica's back
+    with app.app_context():
+        db.session.execute(db.text("UPDATE \"Venue\" SET name = 'Primary Only' WHERE id = 1"))
+        db.session.execute(db.text("UPDATE \"VenueAreaSummary\" SET name = 'Primary Only' WHERE id = 1"))
+        db.session.commit()
+    assert 'Primary Only' not in client.get('/venues').get_data(as_text=True)
+    # searches are posted, but marked read-only
+    results = client.post('/venues/search', data={'search_term': 'venue'}).get_data(as_text=True)
+    assert 'Venue 1' in results and 'Primary Only' not in results
+    assert replica.reads == 2
+
+
+def test_writers_read_their_writes(app, client, replica):
+    other = app.test_client()
+    client.post('/venues/create', data=FORM)
+    with client.session_transaction() as session:
+        session.pop('_flashes', None)
+
+    # the writer reads from the primary, the others from the stale replica
+    assert 'The Replica Room' in client.get('/venues').get_data(as_text=True)
+    assert 'The Replica Room' not in other.get('/venues').get_data(as_text=True)
+    assert replica.reads == 1
+
+    # until READ_YOUR_WRITES_SECONDS have passed
+    with client.session_transaction() as session:
+        session['_primary_until'] = 0
+    assert 'The Replica Room' not in client.get('/venues').get_data(as_text=True)
+    assert replica.reads == 2
+
+
+def test_a_failing_replica_is_skipped(app, client, replica, tmp_path):
+    app.config['REPLICA_CHECK_INTERVAL'] = 0
+    app.extensions['replicas'].interval = 0
+    with app.app_context():
+        db.engines[replica.key].dispose()
+    os.remove(str(tmp_path / 'replica.db'))
+    os.mkdir(str(tmp_path / 'replica.db'))
+
+    assert client.get('/venues').status_code == 200
+    assert not replica.healthy and replica.failures == 1
+    assert replica.reads == 0
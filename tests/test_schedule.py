@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from extensions import db
+from models import Show
+
+
+def schedule(client, rows):
+    return client.post('/shows/schedule', json=rows)
+
+
+def test_shows_are_booked(client, data):
+    start = data['upcoming'] + timedelta(days=3)
+    response = schedule(client, [{'venue_id': 2, 'artist_id': 3, 'start_time': start.isoformat()},
+                                 {'venue_id': 3, 'artist_id': 3, 'start_time': (start + timedelta(hours=2)).isoformat(),
+                                  'duration': 60}])
+    assert response.status_code == 201
+    assert [show['row'] for show in response.get_json()['created']] == [0, 1]
+
+
+def test_overlapping_shows_are_refused(client, data):
+    start = data['upcoming'] + timedelta(days=3)
+    response = schedule(client, [
+        # the venue already has a show then
+        {'venue_id': 1, 'artist_id': 3, 'start_time': (data['upcoming'] + timedelta(hours=1)).isoformat()},
+        {'venue_id': 2, 'artist_id': 3, 'start_time': start.isoformat()},
+        # the artist plays the row before
+        {'venue_id': 3, 'artist_id': 3, 'start_time': (start + timedelta(minutes=90)).isoformat()},
+        {'venue_id': 3, 'artist_id': 1, 'start_time': start.isoformat(), 'duration': 0},
+        {'venue_id': 99, 'artist_id': 1, 'start_time': start.isoformat()},
+    ])
+    assert response.status_code == 201
+    report = response.get_json()
+    assert [show['row'] for show in report['created']] == [1]
+    errors = {conflict['row']: conflict['errors'] for conflict in report['conflicts']}
+    assert errors[0] == ['venue 1 is booked by show 2']
+    assert errors[2] == ['artist 3 is booked by row 1']
+    assert errors[3] == ['duration must be between 1 and 1440 minutes']
+    assert errors[4] == ['unknown venue 99']
+
+
+def test_nothing_booked_is_a_conflict(client, data):
+    response = schedule(client, [{'venue_id': 1, 'artist_id': 2, 'start_time': data['upcoming'].isoformat()}])
+    assert response.status_code == 409
+    assert schedule(client, {'shows': 'x'}).status_code == 400
+
+
+def test_times_with_an_offset_are_stored_as_local_time(app, client, data):
+    response = schedule(client, [{'venue_id': 2, 'artist_id': 3, 'start_time': '2020-01-01T00:00:00+05:00'}])
+    assert response.status_code == 201
+    expected = datetime(2020, 1, 1, tzinfo=timezone(timedelta(hours=5))).astimezone().replace(tzinfo=None)
+    with app.app_context():
+        show = db.session.get(Show, response.get_json()['created'][0]['id'])
+        assert show.start_time == expected
+        assert show.end_time == expected + app.config['SHOW_DEFAULT_DURATION']
+
+    # and compared with the shows stored before
+    again = schedule(client, [{'venue_id': 2, 'artist_id': 1, 'start_time': expected.isoformat()}])
+    assert again.status_code == 409
+
+
+def test_export_filters_accept_offsets(client, data):
+    since = (datetime.now(timezone.utc) + timedelta(days=3)).isoformat()
+    response = client.get('/export/shows.jsonl', query_string={'start_after': since})
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == ''
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from extensions import db
+from summary import VENUE_AREAS
+
+
+def summary_rows(app):
+    with app.app_context():
+        return {row.id: row for row in db.session.query(VENUE_AREAS)}
+
+
+def tamper(app, venue_id):
+    # a name only a full refresh would put right
+    with app.app_context():
+        db.session.execute(VENUE_AREAS.update().where(VENUE_AREAS.c.id == venue_id).values(name='Stale'))
+        db.session.commit()
+
+
+def test_a_new_show_refreshes_only_its_venue(app, client, data):
+    tamper(app, 3)
+    start = (datetime.now() + timedelta(days=5)).strftime('%Y-%m-%d %H:%M:%S')
+    client.post('/shows/create', data={'venue_id': 2, 'artist_id': 3, 'start_time': start})
+    rows = summary_rows(app)
+    assert rows[2].num_upcoming_shows == 1
+    assert rows[3].name == 'Stale'
+
+
+def test_deleted_venues_leave_the_summary(app, client, data):
+    assert client.delete('/venues/3').status_code == 200
+    assert 3 not in summary_rows(app)
+
+
+def test_venue_edits_refresh_their_row(app, client, data):
+    client.post('/venues/2/edit', data={'name': 'The Second Room', 'city': 'Oakland', 'state': 'CA',
+                                        'address': '2 Main St', 'phone': '555-0002', 'genres': 'Jazz',
+                                        'facebook_link': 'https://www.facebook.com/venue2'})
+    row = summary_rows(app)[2]
+    assert (row.name, row.city) == ('The Second Room', 'Oakland')
+
+
+def test_the_command_refreshes_every_row(app, data):
+    tamper(app, 3)
+    result = app.test_cli_runner().invoke(args=['refresh-venue-areas'])
+    assert result.exit_code == 0
+    assert summary_rows(app)[3].name == 'Venue 3'
@@ -0,0 +1 @@
+# The blueprints of the app, registered by create_app() in app.py
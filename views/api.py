@@ -0,0 +1,127 @@
+from flask import Blueprint, abort, request
+import api
+from extensions import cache, db
+from models import Artist, Show, Venue
+from queries import (ARTISTS_KEY, SHOWS_KEY, VENUE_AREAS_KEY, keyset_page, not_modified, page_validators,
+                     show_listing, shows_query, with_validators)
+
+# The read-only JSON API, see api.py for its helpers
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+# fields of the venues, artists and shows served by /api/v1
+API_FIELDS = {
+    Venue: ('id', 'name', 'city', 'state', 'address', 'phone', 'genres', 'image_link', 'facebook_link',
+            'upcoming_shows_count'),
+    Artist: ('id', 'name', 'city', 'state', 'phone', 'genres', 'image_link', 'facebook_link',
+             'upcoming_shows_count'),
+}
+SHOW_API_FIELDS = ('id', 'start_time', 'venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link')
+API_LISTING_KEYS = {Venue: VENUE_AREAS_KEY, Artist: ARTISTS_KEY}
+
+
+def api_selection(name, available, default=None):
+    try:
+        return api.selection(request.args.get(name), available, default)
+    except ValueError as error:
+        abort(400, '{} {}'.format(name, error))
+
+
+def embedded_upcoming_shows(entity, ids):
+    # the upcoming shows of the given venues or artists by their id, in
+    # one query whatever the number of ids
+    column = Show.venue_id if entity is Venue else Show.artist_id
+    shows = {id: [] for id in ids}
+    if ids:
+        for show in shows_query().filter(column.in_(ids)).order_by(*SHOWS_KEY):
+            shows[getattr(show, column.key)].append(show)
+    return shows
+
+
+def api_column(entity, field):
+    # listings read the genres from the column kept for search, which
+    # saves a query per page
+    if field == 'genres':
+        return entity.genre_names.label('genres')
+    return getattr(entity, field)
+
+
+def api_listing(entity):
+    # one page of venues or artists in the order of their HTML listing,
+    # with ?fields= and ?embed=upcoming_shows
+    fields = api_selection('fields', API_FIELDS[entity])
+    embed = api_selection('embed', ('upcoming_shows',), default=())
+    keys = API_LISTING_KEYS[entity]
+    keyNames = {column.key for column in keys}
+    query = db.session.query(*keys, *[api_column(entity, field) for field in fields if field not in keyNames])
+    rows, pagination = keyset_page(query, keys)
+    tag = entity.__tablename__.lower() + ':{}'
+    cache.tag(*[tag.format(row.id) for row in rows])
+
+    data = api.records(rows, fields)
+    if 'upcoming_shows' in embed:
+        upcoming = embedded_upcoming_shows(entity, [row.id for row in rows])
+        for record, row in zip(data, rows):
+            record['upcoming_shows'] = api.records(upcoming[row.id], SHOW_API_FIELDS)
+    return api.response({"data": data, "links": pagination})
+
+
+def api_detail(entity, entity_id):
+    # a venue or artist with ?fields= and ?embed=upcoming_shows,past_shows,
+    # the past shows paginated with ?page= like on its page
+    fields = api_selection('fields', API_FIELDS[entity])
+    embed = api_selection('embed', ('upcoming_shows', 'past_shows'), default=())
+    specificEntity, etag, lastModified = page_validators(entity, entity_id)
+    notModified = not_modified(etag, lastModified)
+    if notModified is not None:
+        return notModified
+
+    data = api.records([specificEntity], fields)[0]
+    if embed:
+        listing = show_listing(entity, entity_id, request.args.get('page', 1, type=int))
+        for section in embed:
+            data[section] = listing[section]
+            data[section + '_count'] = listing[section + '_count']
+        if 'past_shows' in embed:
+            data['past_shows_page'] = listing['past_shows_page']
+            data['past_shows_pages'] = listing['past_shows_pages']
+        counterpart = 'artist' if entity is Venue else 'venue'
+        cache.tag(*['{}:{}'.format(counterpart, show[counterpart + '_id'])
+                    for section in embed for show in listing[section]])
+    return with_validators(api.response({"data": data}), etag, lastModified)
+
+
+@bp.route('/venues')
+@cache.cached('venues')
+def api_venues():
+    return api_listing(Venue)
+
+
+@bp.route('/venues/<int:venue_id>')
+@cache.cached('venue:{venue_id}')
+def api_venue(venue_id):
+    return api_detail(Venue, venue_id)
+
+
+@bp.route('/artists')
+@cache.cached('artists')
+def api_artists():
+    return api_listing(Artist)
+
+
+@bp.route('/artists/<int:artist_id>')
+@cache.cached('artist:{artist_id}')
+def api_artist(artist_id):
+    return api_detail(Artist, artist_id)
+
+
+@bp.route('/shows')
+@cache.cached('shows')
+def api_shows():
+    # one page of shows like /shows, upcoming ones unless ?include_past=1
+    fields = api_selection('fields', SHOW_API_FIELDS)
+    include_past = request.args.get('include_past', 0, type=int) == 1
+    rows, pagination = keyset_page(shows_query(include_past), SHOWS_KEY)
+    cache.tag(*['venue:{}'.format(row.venue_id) for row in rows])
+    cache.tag(*['artist:{}'.format(row.artist_id) for row in rows])
+    return api.response({"data": api.records(rows, fields), "links": pagination})
@@ -0,0 +1,176 @@
+import asyncio
+from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
+import aio
+from extensions import async_db, cache, db, replicas, suggestions
+from models import STATES, Artist
+from queries import (ARTISTS_KEY, keyset_page, listing_sections, not_modified, page_query, page_validators,
+                     search_query, set_genres, show_listing, show_listing_query, validators, with_validators)
+
+bp = Blueprint('artists', __name__)
+
+
+@bp.route('/artists')
+@cache.cached('artists')
+def artists():
+    rows, pagination = keyset_page(Artist.query.with_entities(Artist.id, Artist.name, Artist.updated_at),
+                                   ARTISTS_KEY)
+    cache.tag(*['artist:{}'.format(row.id) for row in rows])
+    data = []
+    for artist in rows:
+        singleArtist = {
+            "id": artist.id,
+            "name": artist.name,
+            "updated_at": artist.updated_at
+        }
+        data.append(singleArtist)
+
+    return render_template('pages/artists.html', artists=data, pagination=pagination)
+
+
+@bp.route('/artists/search', methods=['POST'])
+@replicas.read_only
+def search_artists():
+    searchTerm = request.form.get('search_term', '')
+    artists = search_query(Artist, searchTerm).all()
+
+    data = {
+        "count": len(artists),
+        "data": [{
+            "id": artist.id,
+            "name": artist.name,
+            "updated_at": artist.updated_at,
+            "num_upcoming_shows": artist.num_upcoming_shows
+        } for artist in artists]
+    }
+    return render_template('pages/search_artists.html', results=data, search_term=request.form.get('search_term', ''))
+
+
+@bp.route('/artists/<int:artist_id>')
+@cache.cached('artist:{artist_id}')
+def show_artist(artist_id):
+    specificArtist, etag, lastModified = page_validators(Artist, artist_id)
+    notModified = not_modified(etag, lastModified)
+    if notModified is not None:
+        return notModified
+    listing = show_listing(Artist, artist_id, request.args.get('page', 1, type=int))
+    return render_artist(specificArtist, listing, etag, lastModified)
+
+
+@aio.view('artists.show_artist')
+@cache.cached('artist:{artist_id}')
+async def show_artist_async(artist_id):
+    # show_artist() in ASGI mode, the artist and its shows queried together
+    page = max(request.args.get('page', 1, type=int), 1)
+    row, rows = await asyncio.gather(async_db.first(page_query(Artist, artist_id)),
+                                     async_db.all(show_listing_query(Artist, artist_id, page).statement))
+    specificArtist, etag, lastModified = validators(Artist, artist_id, row)
+    notModified = not_modified(etag, lastModified)
+    if notModified is not None:
+        return notModified
+    return render_artist(specificArtist, listing_sections(Artist, rows, page), etag, lastModified)
+
+
+def render_artist(specificArtist, listing, etag, lastModified):
+    artist_id = specificArtist.id
+    data = {
+        "id": artist_id,
+        "name": specificArtist.name,
+        "genres": [genre.name for genre in specificArtist.genres],
+        "city": specificArtist.city,
+        "state": specificArtist.state,
+        "phone": specificArtist.phone,
+        "website": "https://www.themusicalhop.com",
+        "facebook_link": specificArtist.facebook_link,
+        "seeking_talent": True,
+        "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
+        "image_link": specificArtist.image_link
+    }
+    data.update(listing)
+    cache.tag(*['venue:{}'.format(show['venue_id']) for show in data['upcoming_shows'] + data['past_shows']])
+
+    return with_validators(render_template('pages/show_artist.html', artist=data), etag, lastModified)
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+    from forms import ArtistForm
+    form = ArtistForm()
+    specificArtist = db.get_or_404(Artist, artist_id)
+
+    artist = {
+      "id": artist_id,
+      "name": specificArtist.name,
+      "genres": [genre.name for genre in specificArtist.genres],
+      "city": specificArtist.city,
+      "state": specificArtist.state,
+      "phone": specificArtist.phone,
+      "website": "https://www.themusicalhop.com",
+      "facebook_link": specificArtist.facebook_link,
+      "seeking_talent": True,
+      "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
+      "image_link": specificArtist.image_link
+    }
+    form.genres.data = artist['genres']
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+    req = request.form
+    artist = db.get_or_404(Artist, artist_id)
+    if req['state'] not in STATES:
+        abort(422)
+    try:
+        artist.name = req['name']
+        artist.city = req['city']
+        artist.state = req['state']
+        artist.phone = req['phone']
+        set_genres(artist, req.getlist('genres'))
+        artist.facebook_link = req['facebook_link']
+        artist.image_link = 'https://via.placeholder.com/335x500.png'
+        db.session.commit()
+        suggestions.add('artist', artist_id, req['name'])
+        cache.invalidate('artists', 'genres', 'artist:{}'.format(artist_id))
+        flash('Artist ' + req['name'] + ' was successfully changed!')
+    except Exception:
+        flash('An error occurred. Artist ' + req['name'] + ' could not be changed.')
+    finally:
+        db.session.close()
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+    req = request.form
+    if req['state'] not in STATES:
+        abort(422)
+    try:
+        artist = Artist(name=req['name'],
+                    city=req['city'],
+                    state=req['state'],
+                    phone=req['phone'],
+                    facebook_link=req['facebook_link'],
+                    image_link='https://via.placeholder.com/335x500.png')
+        set_genres(artist, req.getlist('genres'))
+        db.session.add(artist)
+        db.session.commit()
+        suggestions.add('artist', artist.id, artist.name)
+        cache.invalidate('artists', 'genres')
+        flash('Artist ' + req['name'] + ' was successfully listed!')
+    except Exception:
+        flash('An error occurred. Artist ' + req['name'] + ' could not be listed.')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
@@ -0,0 +1,126 @@
+import hmac
+from functools import wraps
+from flask import Blueprint, Response, abort, current_app, jsonify, render_template, request, url_for
+import api
+from extensions import cache, instrumentation
+from models import STATES, Artist, Genre, Venue
+from queries import (SHOWS_KEY, genre_members_query, genre_shows_query, genres_query, keyset_page,
+                     load_suggestions, show_tile)
+
+bp = Blueprint('main', __name__)
+
+
+@bp.route('/')
+def index():
+    return render_template('pages/home.html')
+
+
+#  Search suggestions
+#  ----------------------------------------------------------------
+
+@bp.route('/search/suggest')
+def search_suggest():
+    # autocomplete for the search boxes, answered from memory
+    results = load_suggestions().lookup(request.args.get('q', ''), kind=request.args.get('type'))
+    return jsonify({
+        "results": [{
+            "type": kind,
+            "id": id,
+            "name": name,
+            "url": url_for('{0}s.show_{0}'.format(kind), **{kind + '_id': id})
+        } for kind, id, name in results]
+    })
+
+
+#  Genres
+#  ----------------------------------------------------------------
+
+@bp.route('/genres')
+@cache.cached('genres')
+def genres():
+    data = [{
+        "name": genre.name,
+        "num_venues": genre.num_venues,
+        "num_artists": genre.num_artists
+    } for genre in genres_query()]
+    return render_template('pages/genres.html', genres=data)
+
+
+@bp.route('/genres/<name>')
+@cache.cached('genres')
+def show_genre(name):
+    # the upcoming shows of the artists of a genre and its venues and
+    # artists, in every state or only in ?state=
+    genre = Genre.query.filter_by(name=name).first_or_404()
+    state = request.args.get('state')
+    if state and state not in STATES:
+        abort(400)
+    rows, pagination = keyset_page(genre_shows_query(genre.id, state), SHOWS_KEY)
+    venues = genre_members_query(Venue, genre.id, state).limit(current_app.config['ITEMS_PER_PAGE']).all()
+    artists = genre_members_query(Artist, genre.id, state).limit(current_app.config['ITEMS_PER_PAGE']).all()
+    cache.tag(*['venue:{}'.format(id) for id in {row.venue_id for row in rows} | {venue.id for venue in venues}])
+    cache.tag(*['artist:{}'.format(id) for id in {row.artist_id for row in rows} | {artist.id for artist in artists}])
+
+    data = {
+        "name": genre.name,
+        "state": state,
+        "states": STATES,
+        "shows": [show_tile(show) for show in rows],
+        "venues": [{"id": venue.id, "name": venue.name, "updated_at": venue.updated_at,
+                    "num_upcoming_shows": venue.num_upcoming_shows} for venue in venues],
+        "artists": [{"id": artist.id, "name": artist.name, "updated_at": artist.updated_at,
+                     "num_upcoming_shows": artist.num_upcoming_shows} for artist in artists]
+    }
+    return render_template('pages/show_genre.html', genre=data, pagination=pagination)
+
+
+def internal(view):
+    # answers only requests bearing METRICS_TOKEN, e.g. from the metrics
+    # scraper, and is not found while no token is configured
+    @wraps(view)
+    def wrapper(**kwargs):
+        token = current_app.config['METRICS_TOKEN']
+        if not token:
+            abort(404)
+        authorization = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(authorization.encode(), ('Bearer ' + token).encode()):
+            return Response(status=401, headers={'WWW-Authenticate': 'Bearer'})
+        return view(**kwargs)
+    return wrapper
+
+
+@bp.route('/_cache')
+@internal
+def cache_stats():
+    return jsonify(cache.stats())
+
+
+@bp.route('/_metrics')
+@internal
+def metrics():
+    return Response(instrumentation.render(), mimetype='text/plain; version=0.0.4')
+
+
+def is_api_request():
+    return request.path.startswith('/api/')
+
+
+@bp.app_errorhandler(400)
+def bad_request_error(error):
+    if is_api_request():
+        return api.error(400, error.description)
+    return error
+
+
+@bp.app_errorhandler(404)
+def not_found_error(error):
+    if is_api_request():
+        return api.error(404, 'not found')
+    return render_template('errors/404.html'), 404
+
+
+@bp.app_errorhandler(500)
+def server_error(error):
+    if is_api_request():
+        return api.error(500, 'internal server error')
+    return render_template('errors/500.html'), 500
@@ -0,0 +1,91 @@
+from flask import Blueprint, Response, abort, flash, render_template, request, stream_with_context
+import api
+import export
+from extensions import cache, db
+from queries import (EXPORT_COLUMNS, SHOWS_KEY, export_filters, export_shows_query, invalidate_shows,
+                     keyset_page, refresh_venue_areas, schedule_shows, show_tile, shows_query)
+
+bp = Blueprint('shows', __name__)
+
+
+@bp.route('/shows')
+@cache.cached('shows')
+def shows():
+    # displays list of shows at /shows, upcoming ones only unless asked
+    # for the full calendar
+    include_past = request.args.get('include_past', 0, type=int) == 1
+    rows, pagination = keyset_page(shows_query(include_past), SHOWS_KEY)
+    cache.tag(*['venue:{}'.format(row.venue_id) for row in rows])
+    cache.tag(*['artist:{}'.format(row.artist_id) for row in rows])
+
+    data = [show_tile(show) for show in rows]
+
+    return render_template('pages/shows.html', shows=data, pagination=pagination, include_past=include_past)
+
+
+@bp.route('/export/shows.<any(jsonl, csv):format>')
+def export_shows(format):
+    # streams every show as JSON lines or CSV, filtered by
+    # ?start_after=, ?start_before= and ?modified_since=, gzipped for
+    # clients accepting it
+    try:
+        query = export_shows_query(**export_filters(request.args))
+    except ValueError:
+        abort(400)
+    body = export.chunks(export.lines(query, EXPORT_COLUMNS, format))
+    headers = {'Content-Disposition': 'attachment; filename=shows.' + format, 'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip']:
+        body = export.gzipped(body)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(body), mimetype=export.MIMETYPES[format], headers=headers)
+
+
+@bp.route('/shows/create')
+def create_shows():
+    # renders form. do not touch.
+    from forms import ShowForm
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+    req = request.form
+    try:
+        shows, refused = schedule_shows([(1, req)])
+        if refused:
+            db.session.rollback()
+            flash('Show could not be created: ' + '; '.join(refused[0][1]))
+        else:
+            db.session.commit()
+            refresh_venue_areas({show.venue_id for number, show in shows})
+            invalidate_shows([show for number, show in shows])
+            flash('Show Successfully Added')
+    except Exception:
+        flash('An error occurred. Show could not be created')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+
+@bp.route('/shows/schedule', methods=['POST'])
+def schedule_shows_submission():
+    # books a JSON list of shows, e.g. a whole tour, in one transaction.
+    # Rows clashing with a show of their venue or artist are refused and
+    # reported by their position in the list, the others are created.
+    rows = request.get_json(silent=True)
+    if isinstance(rows, dict):
+        rows = rows.get('shows')
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+        return api.error(400, 'expected a list of shows')
+    shows, refused = schedule_shows(list(enumerate(rows)))
+    db.session.commit()
+    if shows:
+        refresh_venue_areas({show.venue_id for number, show in shows})
+    invalidate_shows([show for number, show in shows])
+
+    report = {
+        "created": [{"row": number, "id": show.id} for number, show in shows],
+        "conflicts": [{"row": number, "errors": errors} for number, errors in refused]
+    }
+    return api.response(report, 201 if shows else 409)
@@ -0,0 +1,212 @@
+import asyncio
+from itertools import groupby
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, url_for
+import aio
+from extensions import async_db, cache, db, replicas, suggestions
+from models import STATES, Venue
+from queries import (VENUE_SUMMARY_KEY, keyset_page, listing_sections, not_modified, page_query, page_validators,
+                     refresh_venue_areas, search_query, set_genres, show_listing, show_listing_query, validators,
+                     venue_areas_query, with_validators)
+
+bp = Blueprint('venues', __name__)
+
+
+@bp.route('/venues')
+@cache.cached('venues')
+def venues():
+    # venues are ordered by area so that venues of the same area come out
+    # next to each other, read from the summary kept in that order
+    rows, pagination = keyset_page(venue_areas_query(), VENUE_SUMMARY_KEY)
+    cache.tag(*['venue:{}'.format(row.id) for row in rows])
+
+    data = []
+    for (city, state), areaVenues in groupby(rows, key=lambda row: (row.city, row.state)):
+        data.append({
+            "city": city,
+            "state": state,
+            "venues": [{
+                "id": venue.id,
+                "name": venue.name,
+                "updated_at": venue.updated_at,
+                "num_upcoming_shows": venue.num_upcoming_shows
+            } for venue in areaVenues]
+        })
+    return render_template('pages/venues.html', areas=data, pagination=pagination)
+
+
+@bp.route('/venues/search', methods=['POST'])
+@replicas.read_only
+def search_venues():
+    searchTerm = request.form.get('search_term', '')
+    venues = search_query(Venue, searchTerm).all()
+
+    data = {
+        "count": len(venues),
+        "data": [{
+            "id": venue.id,
+            "name": venue.name,
+            "updated_at": venue.updated_at,
+            "num_upcoming_shows": venue.num_upcoming_shows
+        } for venue in venues]
+    }
+    return render_template('pages/search_venues.html', results=data, search_term=request.form.get('search_term', ''))
+
+
+@bp.route('/venues/<int:venue_id>')
+@cache.cached('venue:{venue_id}')
+def show_venue(venue_id):
+    specificVenue, etag, lastModified = page_validators(Venue, venue_id)
+    notModified = not_modified(etag, lastModified)
+    if notModified is not None:
+        return notModified
+    listing = show_listing(Venue, venue_id, request.args.get('page', 1, type=int))
+    return render_venue(specificVenue, listing, etag, lastModified)
+
+
+@aio.view('venues.show_venue')
+@cache.cached('venue:{venue_id}')
+async def show_venue_async(venue_id):
+    # show_venue() in ASGI mode, the venue and its shows queried together
+    page = max(request.args.get('page', 1, type=int), 1)
+    row, rows = await asyncio.gather(async_db.first(page_query(Venue, venue_id)),
+                                     async_db.all(show_listing_query(Venue, venue_id, page).statement))
+    specificVenue, etag, lastModified = validators(Venue, venue_id, row)
+    notModified = not_modified(etag, lastModified)
+    if notModified is not None:
+        return notModified
+    return render_venue(specificVenue, listing_sections(Venue, rows, page), etag, lastModified)
+
+
+def render_venue(specificVenue, listing, etag, lastModified):
+    venue_id = specificVenue.id
+    data = {
+        "id": venue_id,
+        "name": specificVenue.name,
+        "genres": [genre.name for genre in specificVenue.genres],
+        "address": specificVenue.address,
+        "city": specificVenue.city,
+        "state": specificVenue.state,
+        "phone": specificVenue.phone,
+        "website": "https://www.themusicalhop.com",
+        "facebook_link": specificVenue.facebook_link,
+        "seeking_talent": True,
+        "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
+        "image_link": specificVenue.image_link
+    }
+    data.update(listing)
+    cache.tag(*['artist:{}'.format(show['artist_id']) for show in data['upcoming_shows'] + data['past_shows']])
+
+    return with_validators(render_template('pages/show_venue.html', venue=data), etag, lastModified)
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+    req = request.form
+    if req['state'] not in STATES:
+        abort(422)
+    try:
+        venue = Venue(name=req['name'],
+                    city=req['city'],
+                    state=req['state'],
+                    address=req['address'],
+                    phone=req['phone'],
+                    facebook_link=req['facebook_link'],
+                    image_link='https://via.placeholder.com/335x500.png')
+        set_genres(venue, req.getlist('genres'))
+        db.session.add(venue)
+        db.session.commit()
+        suggestions.add('venue', venue.id, venue.name)
+        refresh_venue_areas([venue.id])
+        cache.invalidate('venues', 'genres')
+        flash('Venue ' + req['name'] + ' was successfully listed!')
+    except Exception:
+        flash('An error occurred. Venue ' + req['name'] + ' could not be listed.')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
+
+
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+    error = False
+    try:
+        Venue.query.filter_by(id=venue_id).delete()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = True
+    finally:
+        db.session.close()
+    if error:
+        abort(400)
+    else:
+        suggestions.remove('venue', int(venue_id))
+        refresh_venue_areas([int(venue_id)])
+        cache.invalidate('venues', 'genres', 'venue:{}'.format(venue_id))
+        return jsonify({'success': True})
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+    from forms import VenueForm
+    form = VenueForm()
+    specificVenue = db.get_or_404(Venue, venue_id)
+
+    venue = {
+      "id": venue_id,
+      "name": specificVenue.name,
+      "genres": [genre.name for genre in specificVenue.genres],
+      "address": specificVenue.address,
+      "city": specificVenue.city,
+      "state": specificVenue.state,
+      "phone": specificVenue.phone,
+      "website": "https://www.themusicalhop.com",
+      "facebook_link": specificVenue.facebook_link,
+      "seeking_talent": True,
+      "seeking_description": "We are on the lookout for a local artist to play every two weeks. Please call us.",
+      "image_link": specificVenue.image_link
+    }
+    form.genres.data = venue['genres']
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+    req = request.form
+    venue = db.get_or_404(Venue, venue_id)
+
+    if req['state'] not in STATES:
+        abort(422)
+        
+    try:
+        venue.name = req['name']
+        venue.city = req['city']
+        venue.state = req['state']
+        venue.address = req['address']
+        venue.phone = req['phone']
+        set_genres(venue, req.getlist('genres'))
+        venue.facebook_link = req['facebook_link']
+        venue.image_link = 'https://via.placeholder.com/335x500.png'
+        db.session.commit()
+        suggestions.add('venue', venue_id, req['name'])
+        refresh_venue_areas([venue_id])
+        cache.invalidate('venues', 'genres', 'venue:{}'.format(venue_id))
+        flash('Venue ' + req['name'] + ' was successfully changed!')
+    except Exception:
+        flash('An error occurred. Venue ' + req['name'] + ' could not be changed.')
+    finally:
+        db.session.close()
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))
@@ -0,0 +1,5 @@
+from app import create_app
+
+# Entry point of WSGI servers, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`,
+# configured from the environment, see config.py
+app = create_app()